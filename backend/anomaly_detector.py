@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+# 阈值规则：取值小于等于下限或大于等于上限时报警（低血压/高血压危象、心动过缓/心动过速）
+VITAL_LIMITS = {
+    'systolic_bp': (90, 180),
+    'heart_rate': (50, 100),
+}
+ALERT_KINDS = ['骤升', '骤降', '超上限', '低于下限']
+# 方差的先验（典型测量波动的标准差）：每名患者的方差从先验开始指数加权更新，
+# 不会因为前几次观测的方差估计偏小而误报；标准差下限避免波动极小的患者对微小变化报警
+PRIOR_STD = {
+    'systolic_bp': 10.0,
+    'heart_rate': 6.0,
+}
+MIN_STD = {
+    'systolic_bp': 2.0,
+    'heart_rate': 1.5,
+}
+
+
+class AnomalyDetector:
+    """所有患者生命体征的流式异常检测
+
+    每名患者每项指标的指数加权均值和方差保存在 (指标数, 患者数) 的float32 numpy数组中
+    （按指标连续存放，与每项指标的参数比较时沿患者方向广播，比 (患者数, 指标数) 快数倍），
+    每个模拟周期对所有（或发生变化的）患者一次向量化计算z分数和阈值规则，再更新均值和方差。
+    方差以prior_std²为初值，并用比均值更小的variance_alpha更新：方差估计平均的样本更多，
+    稳定后的误报率才接近z阈值对应的正态尾部概率。
+    方差始终不低于min_std²；z分数用更新前的均值和方差计算，观测次数达到warmup之后才启用；阈值规则始终启用。
+    报警按周期成批保存（行号、指标、类型等数组），查询时才展开为字典。
+    """
+
+    def __init__(self, initial, vitals=tuple(VITAL_LIMITS), ids=None, alpha=0.1, variance_alpha=0.03,
+                 z_threshold=3.0, limits=VITAL_LIMITS, prior_std=PRIOR_STD, min_std=MIN_STD, warmup=5,
+                 history=1000):
+        """initial为各患者当前的测量值，形状为 (指标数, 患者数)，指标顺序与vitals一致"""
+        self.vitals = list(vitals)
+        self.ids = ids
+        self.alpha = alpha
+        self.variance_alpha = variance_alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        # 每项指标一个参数，形状为 (指标数, 1)，沿患者方向广播
+        self.low = np.array([[limits[vital][0]] for vital in self.vitals], dtype=np.float32)
+        self.high = np.array([[limits[vital][1]] for vital in self.vitals], dtype=np.float32)
+        self.min_var = np.array([[min_std[vital] ** 2] for vital in self.vitals], dtype=np.float32)
+        self.mean = np.array(initial, dtype=np.float32)
+        self.var = np.empty_like(self.mean)
+        self.var[:] = np.array([[prior_std[vital] ** 2] for vital in self.vitals], dtype=np.float32)
+        self.count = np.ones(self.mean.shape[1], dtype=np.int32)
+        self._batches = deque(maxlen=history)
+        self.sequence = 0
+
+    def watch(self, store):
+        """订阅患者存储：生命体征变化时只对变化的患者做一次检测"""
+        def on_change(rows, old, new):
+            if any(vital in new for vital in self.vitals):
+                self.observe(np.vstack([store.numeric[vital][rows] for vital in self.vitals]), rows)
+        store.subscribe(on_change)
+        return self
+
+    def observe(self, values, rows=None):
+        """加入一个周期的观测值 (指标数, 患者数)：rows为None时是所有患者，否则是rows这些患者，返回本周期报警数"""
+        values = np.ascontiguousarray(values, dtype=np.float32)
+        if rows is None:
+            mean, var, count = self.mean, self.var, self.count
+        else:
+            mean, var, count = self.mean[:, rows], self.var[:, rows], self.count[rows]
+
+        # |z| > 阈值 等价于 diff² > 阈值² × 方差，全量数组上只做乘法和比较，不开方也不做除法
+        diff = values - mean
+        squared = diff * diff
+        flagged = squared > (self.z_threshold ** 2) * var
+        if count.min() < self.warmup:
+            flagged &= count >= self.warmup
+        flagged |= values >= self.high
+        flagged |= values <= self.low
+        flat = np.flatnonzero(flagged)
+        flagged_vitals, flagged_rows = np.divmod(flat, values.shape[1])
+
+        # 只对报警的少数观测计算z分数和类型，同一观测同时满足多条规则时取阈值规则
+        value = values.ravel()[flat]
+        expected = mean.ravel()[flat]
+        z = diff.ravel()[flat] / np.sqrt(var.ravel()[flat])
+        kind = np.where(z > 0, 0, 1).astype(np.int8)
+        kind[value >= self.high[flagged_vitals, 0]] = 2
+        kind[value <= self.low[flagged_vitals, 0]] = 3
+
+        # 指数加权均值和方差的增量更新：mean += α·diff，var = (1-β)(var + β·diff²)，β为variance_alpha
+        diff *= self.alpha
+        mean += diff
+        squared *= self.variance_alpha
+        var += squared
+        var *= 1 - self.variance_alpha
+        np.maximum(var, self.min_var, out=var)
+        count += 1
+        if rows is not None:
+            self.mean[:, rows], self.var[:, rows], self.count[rows] = mean, var, count
+
+        if len(flat):
+            self.sequence += 1
+            self._batches.append((
+                self.sequence, datetime.now().isoformat(timespec='seconds'),
+                flagged_rows if rows is None else np.asarray(rows)[flagged_rows], flagged_vitals,
+                kind, value, z, expected,
+            ))
+        return len(flat)
+
+    def alerts(self, since=0, limit=100):
+        """返回批次序号大于since的报警，最新的在前，最多limit条"""
+        result = []
+        for sequence, timestamp, rows, vitals, kinds, values, z, expected in reversed(list(self._batches)):
+            if sequence <= since:
+                break
+            for i in range(len(rows)):
+                if len(result) >= limit:
+                    return result
+                row = int(rows[i])
+                result.append({
+                    'sequence': sequence,
+                    'timestamp': timestamp,
+                    'patient_id': str(self.ids[row]) if self.ids is not None else row,
+                    'vital': self.vitals[vitals[i]],
+                    'kind': ALERT_KINDS[kinds[i]],
+                    'value': float(values[i]),
+                    'expected': round(float(expected[i]), 2),
+                    'z_score': round(float(z[i]), 2),
+                })
+        return result
+
+
+if __name__ == '__main__':
+    # 基准测试：100万名患者，每个周期对所有人的收缩压和心率做一次检测
+    # 测量值为各自基线加正态噪声，最后一个周期给100名患者注入收缩压骤升，其余报警都是误报；
+    # 周期数足够多，方差先验的影响衰减后再统计稳定状态下的误报
+    n_patients, n_ticks = 1_000_000, 150
+    rng = np.random.default_rng(42)
+    baseline = np.vstack([rng.integers(110, 160, n_patients), rng.integers(65, 90, n_patients)]).astype(np.float32)
+    noise = np.array([[5.0], [3.0]], dtype=np.float32)
+    detector = AnomalyDetector(baseline + rng.normal(0, 1, baseline.shape).astype(np.float32) * noise)
+    spiked = rng.choice(n_patients, 100, replace=False)
+    n_observations = n_patients * len(detector.vitals)
+    elapsed = []
+    for tick in range(n_ticks):
+        values = baseline + rng.normal(0, 1, baseline.shape).astype(np.float32) * noise
+        if tick == n_ticks - 1:
+            values[0, spiked] += 40
+        start = time.perf_counter()
+        n_alerts = detector.observe(values)
+        elapsed.append(time.perf_counter() - start)
+        if tick == detector.warmup - 1:
+            first_active = n_alerts
+
+    alerts = detector.alerts(limit=n_alerts)
+    injected = set(spiked.tolist())
+    detected = {a['patient_id'] for a in alerts if a['vital'] == 'systolic_bp' and a['patient_id'] in injected}
+    false_alerts = [a for a in alerts if not (a['vital'] == 'systolic_bp' and a['patient_id'] in injected)]
+    z_false = sum(a['kind'] in ('骤升', '骤降') for a in false_alerts)
+    print(f'患者数: {n_patients:,}，指标数: {len(detector.vitals)}，周期数: {n_ticks}')
+    print(f'每周期耗时: 中位数 {np.median(elapsed) * 1000:.1f} ms，最大 {max(elapsed) * 1000:.1f} ms')
+    print(f'z分数规则启用后的第一个周期报警数: {first_active}（{first_active / n_observations:.3%}，均为误报）')
+    print(f'最后一个周期报警数: {n_alerts}，注入的100次收缩压骤升检出: {len(detected)}')
+    print(f'最后一个周期误报: {len(false_alerts)} 次（{len(false_alerts) / n_observations:.3%}），'
+          f'其中z分数规则 {z_false} 次（正态分布|z|>{detector.z_threshold:g}的理论比例约0.27%），'
+          f'阈值规则 {len(false_alerts) - z_false} 次')
@@ -1,3 +1,5 @@
+import os
+import sys
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import numpy as np
@@ -8,6 +10,17 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 import json
 
+# 后端复用项目根目录下的模块（分段草图使用quantile_sketch.py中的t-digest）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patient_store import PatientStore
+from segment_sketches import SegmentSketches
+from leaderboard import RiskLeaderboard
+from similarity_index import SimilarityIndex
+from anomaly_detector import AnomalyDetector
+from vitals_simulator import VitalsSimulator
+from risk_scoring import static_risk_scores, vital_risk_scores, risk_levels
+
 app = Flask(__name__)
 CORS(app)
 
@@ -78,65 +91,55 @@ def generate_patient_data(n_patients=1000):
             'follow_up_visits': random.randint(1, 5)
         }
         
-        # 改进的风险评分系统
-        risk_score = 0
-        
-        # 年龄风险
-        if age > 75: risk_score += 4
-        elif age > 65: risk_score += 3
-        elif age > 55: risk_score += 2
-        elif age > 45: risk_score += 1
-        
-        # 血压风险
-        if systolic_bp >= 180: risk_score += 4
-        elif systolic_bp >= 160: risk_score += 3
-        elif systolic_bp >= 140: risk_score += 2
-        
-        if diastolic_bp >= 110: risk_score += 3
-        elif diastolic_bp >= 90: risk_score += 2
-        
-        # 心率风险
-        if heart_rate > 100 or heart_rate < 50: risk_score += 2
-        elif heart_rate > 90 or heart_rate < 60: risk_score += 1
-        
-        # 胆固醇风险
-        if cholesterol >= 280: risk_score += 3
-        elif cholesterol >= 240: risk_score += 2
-        elif cholesterol >= 200: risk_score += 1
-        
-        # 其他风险因素
-        if patient['smoking'] == '是': risk_score += 3
-        if patient['diabetes'] == '是': risk_score += 3
-        if patient['bmi'] >= 30: risk_score += 2
-        elif patient['bmi'] >= 25: risk_score += 1
-        if patient['exercise_hours'] < 2: risk_score += 2
-        elif patient['exercise_hours'] < 5: risk_score += 1
-        
-        # 症状相关风险
-        if '胸痛' in patient['symptoms']: risk_score += 3
-        if len(patient['symptoms']) >= 3: risk_score += 2
-        elif len(patient['symptoms']) >= 2: risk_score += 1
-        
-        # 根据总分确定风险等级
-        if risk_score <= 5:
-            patient['risk_level'] = '低风险'
-        elif risk_score <= 12:
-            patient['risk_level'] = '中风险'
-        else:
-            patient['risk_level'] = '高风险'
-            
         data.append(patient)
     
+    # 改进的风险评分系统：向量化计算，模拟器重新评分时使用同一套规则
+    risk_score = static_risk_scores(data) + vital_risk_scores(
+        [patient['systolic_bp'] for patient in data],
+        [patient['diastolic_bp'] for patient in data],
+        [patient['heart_rate'] for patient in data]
+    )
+    for patient, score, level in zip(data, risk_score.tolist(), risk_levels(risk_score).tolist()):
+        patient['risk_score'] = score
+        patient['risk_level'] = level
+    
     return data
 
 # 全局数据存储
 patients_data = generate_patient_data()
+# 列式副本与分段分位数草图：所有修改都经过patient_store.update()，草图随之增量更新
+patient_store = PatientStore(patients_data)
+segment_sketches = SegmentSketches(patient_store)
+# 按数值风险评分维护的排行榜
+risk_leaderboard = RiskLeaderboard(patient_store)
+# 相似患者索引，生命体征变化时增量维护
+similarity_index = SimilarityIndex(patient_store)
+# 生命体征异常检测：每次模拟更新后对变化的患者做z分数和阈值检测
+anomaly_detector = AnomalyDetector(
+    np.vstack([patient_store.numeric['systolic_bp'], patient_store.numeric['heart_rate']]),
+    vitals=['systolic_bp', 'heart_rate'],
+    ids=patient_store.ids
+).watch(patient_store)
+# 向量化的生命体征模拟器，直接写入patient_store；每秒一个周期，每周期约更新0.75%的患者，
+# 在后台线程中按节拍运行（见文件末尾的启动代码），不依赖请求推进
+vitals_simulator = VitalsSimulator(patient_store, tick_rate=1.0, mutation_fraction=0.0075)
+
+def int_arg(name, default):
+    """读取整数查询参数：缺省时返回default，不是整数时返回None，由调用方返回400"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return None
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
     """获取统计数据"""
     total = len(patients_data)
-    high_risk = len([p for p in patients_data if p['risk_level'] == '高风险'])
+    with patient_store.lock:
+        high_risk = len([p for p in patients_data if p['risk_level'] == '高风险'])
     return jsonify({
         'total_patients': total,
         'high_risk_patients': high_risk,
@@ -146,33 +149,63 @@ def get_stats():
 @app.route('/api/patients', methods=['GET'])
 def get_patients():
     """获取患者数据"""
-    # 更新部分患者数据以模拟实时变化
-    for i in range(random.randint(5, 10)):
-        idx = random.randint(0, len(patients_data) - 1)
-        patients_data[idx]['systolic_bp'] = random.randint(90, 180)
-        patients_data[idx]['heart_rate'] = random.randint(60, 100)
-        
-        # 重新计算风险等级
-        risk_score = 0
-        if patients_data[idx]['age'] > 60: risk_score += 2
-        if patients_data[idx]['systolic_bp'] > 140: risk_score += 2
-        if patients_data[idx]['diastolic_bp'] > 90: risk_score += 1
-        if patients_data[idx]['heart_rate'] > 90: risk_score += 1
-        if patients_data[idx]['cholesterol'] > 200: risk_score += 2
-        if patients_data[idx]['smoking'] == '是': risk_score += 2
-        if patients_data[idx]['diabetes'] == '是': risk_score += 2
-        if patients_data[idx]['bmi'] > 30: risk_score += 1
-        if patients_data[idx]['exercise_hours'] < 3: risk_score += 1
-        if len(patients_data[idx]['symptoms']) > 2: risk_score += 2
-        
-        if risk_score <= 4:
-            patients_data[idx]['risk_level'] = '低风险'
-        elif risk_score <= 8:
-            patients_data[idx]['risk_level'] = '中风险'
-        else:
-            patients_data[idx]['risk_level'] = '高风险'
+    # 模拟器在后台线程中修改记录，持锁序列化得到一致的快照
+    with patient_store.lock:
+        return jsonify(patients_data)
+
+@app.route('/api/patients/top', methods=['GET'])
+def get_top_patients():
+    """风险评分最高的k名患者，直接从排行榜读取，不排序全部患者"""
+    k = int_arg('k', 10)
+    if k is None or k < 1:
+        return jsonify({'error': 'k必须是正整数'}), 400
+    
+    top = risk_leaderboard.top(min(k, len(patients_data)))
+    return jsonify([
+        dict(patients_data[row], rank=rank + 1) for rank, (row, score) in enumerate(top)
+    ])
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """生命体征异常报警，最新的在前；客户端用上次返回的sequence作为since增量拉取"""
+    since = int_arg('since', 0)
+    limit = int_arg('limit', 100)
+    if since is None or since < 0 or limit is None or limit < 1:
+        return jsonify({'error': 'since必须是非负整数，limit必须是正整数'}), 400
     
-    return jsonify(patients_data)
+    return jsonify({
+        'sequence': anomaly_detector.sequence,
+        'alerts': anomaly_detector.alerts(since=since, limit=limit)
+    })
+
+@app.route('/api/stats/percentiles', methods=['GET'])
+def get_percentiles():
+    """按分段查询生命体征的分位数，由分段草图合并得到，不扫描患者数据
+    
+    例：/api/stats/percentiles?vital=systolic_bp&q=50,90&risk_level=高风险&smoking=是
+    """
+    vital = request.args.get('vital', 'systolic_bp')
+    try:
+        q = [float(v) for v in request.args.get('q', '50,90').split(',')]
+    except ValueError:
+        return jsonify({'error': 'q必须是逗号分隔的百分数'}), 400
+    if any(not 0 <= v <= 100 for v in q):
+        return jsonify({'error': 'q的取值范围为0-100'}), 400
+    
+    filters = {column: value for column, value in request.args.items() if column not in ('vital', 'q')}
+    try:
+        count, stale_fraction, values = segment_sketches.percentiles(vital, q, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'vital': vital,
+        'segment': filters,
+        'count': count,
+        'percentiles': {f'p{v:g}': value for v, value in zip(q, values)},
+        # 所查分段尚未重建前，变化患者的旧值仍保留在草图中，这里是旧值在合并草图中的比例
+        'stale_fraction': round(stale_fraction, 4)
+    })
 
 @app.route('/api/patient/<patient_id>/vitals', methods=['GET'])
 def get_patient_vitals(patient_id):
@@ -201,6 +234,21 @@ def get_patient_vitals(patient_id):
     }
     return jsonify(vitals)
 
+@app.route('/api/patient/<patient_id>/similar', methods=['GET'])
+def get_similar_patients(patient_id):
+    """按标准化后的年龄、血压、心率、胆固醇、BMI和运动时长查找最相似的k名患者"""
+    row = patient_store.row_of.get(patient_id)
+    if row is None:
+        return jsonify({'error': 'Patient not found'}), 404
+    k = int_arg('k', 10)
+    if k is None or k < 1:
+        return jsonify({'error': 'k必须是正整数'}), 400
+    
+    similar = similarity_index.similar(row, k)
+    return jsonify([
+        dict(patients_data[other], distance=round(distance, 4)) for other, distance in similar
+    ])
+
 @app.route('/api/treatments/analysis', methods=['GET'])
 def get_treatment_analysis():
     """获取治疗效果分析"""
@@ -238,4 +286,8 @@ def get_treatment_analysis():
     return jsonify(analysis)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000) 
\ No newline at end of file
+    debug = True
+    # 调试模式下重载器的父进程只监视文件，模拟器只在实际处理请求的子进程中启动
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        vitals_simulator.start()
+    app.run(debug=debug, port=5000) 
\ No newline at end of file
@@ -0,0 +1,90 @@
+import heapq
+import numpy as np
+
+
+class RiskLeaderboard:
+    """按风险评分排序的索引大根堆：记录每名患者在堆中的位置，评分变化时O(log n)上浮或下沉
+
+    取前k名时从堆顶开始按需展开子节点，耗时O(k log k)，不扫描全部患者。
+    评分相同时行号小的患者排在前面。
+    """
+
+    def __init__(self, store, column='risk_score'):
+        self.store = store
+        self.column = column
+        self._rebuild()
+        store.subscribe(self._on_change)
+
+    def _rebuild(self):
+        """按评分从高到低整体排序（降序数组本身就是合法的大根堆），大批量修改时比逐个上浮下沉快"""
+        scores = self.store.column(self.column)
+        heap = np.lexsort((np.arange(len(scores)), -scores))
+        position = np.empty_like(heap)
+        position[heap] = np.arange(len(heap))
+        self._score = scores.astype(np.float64).tolist()
+        self._heap = heap.tolist()
+        self._position = position.tolist()
+
+    def _key(self, row):
+        return self._score[row], -row
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._position[heap[i]] = i
+        self._position[heap[j]] = j
+
+    def _sift_up(self, i):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._key(self._heap[i]) <= self._key(self._heap[parent]):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        n = len(self._heap)
+        while True:
+            largest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._key(self._heap[child]) > self._key(self._heap[largest]):
+                    largest = child
+            if largest == i:
+                return
+            self._swap(i, largest)
+            i = largest
+
+    def update(self, row, score):
+        """修改一名患者的评分并恢复堆序"""
+        previous = self._score[row]
+        self._score[row] = float(score)
+        if score > previous:
+            self._sift_up(self._position[row])
+        elif score < previous:
+            self._sift_down(self._position[row])
+
+    def _on_change(self, rows, old, new):
+        if self.column not in new:
+            return
+        # 每次上浮下沉是O(log n)次Python操作，改动行数多时整体重排更快
+        if len(rows) * max(len(self._heap).bit_length(), 1) * 4 > len(self._heap):
+            self._rebuild()
+            return
+        for row, score in zip(rows.tolist(), new[self.column].tolist()):
+            self.update(int(row), score)
+
+    def top(self, k):
+        """返回评分最高的k名患者的(行号, 评分)，按评分从高到低排列"""
+        result = []
+        with self.store.lock:
+            if not self._heap:
+                return result
+            frontier = [(-self._score[self._heap[0]], self._heap[0], 0)]
+            while frontier and len(result) < k:
+                negative_score, row, i = heapq.heappop(frontier)
+                result.append((row, -negative_score))
+                for child in (2 * i + 1, 2 * i + 2):
+                    if child < len(self._heap):
+                        child_row = self._heap[child]
+                        heapq.heappush(frontier, (-self._score[child_row], child_row, child))
+        return result
@@ -0,0 +1,75 @@
+import threading
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = ['age', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'cholesterol', 'bmi',
+                   'exercise_hours', 'follow_up_visits', 'risk_score']
+CATEGORY_COLUMNS = ['gender', 'smoking', 'diabetes', 'treatment', 'treatment_response', 'risk_level']
+
+
+class PatientStore:
+    """患者数据的列式副本：数值列为numpy数组，类别列为编码数组
+
+    原有接口仍然返回字典列表，所有修改都经过update()，同时写回字典和列数组，
+    再把变化通知给订阅者（统计草图、排行榜、索引等），订阅者只需处理变化的行。
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.ids = np.array([record['patient_id'] for record in records])
+        self.row_of = {patient_id: i for i, patient_id in enumerate(self.ids)}
+        frame = pd.DataFrame(records)
+        self.numeric = {column: frame[column].to_numpy(dtype=np.float64, copy=True) for column in NUMERIC_COLUMNS}
+        self.categories = {}
+        self.codes = {}
+        for column in CATEGORY_COLUMNS:
+            codes, categories = pd.factorize(frame[column])
+            self.codes[column] = codes.astype(np.int32)
+            self.categories[column] = list(categories)
+        self.lock = threading.RLock()
+        self._subscribers = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def subscribe(self, callback):
+        """注册变化回调：callback(rows, old, new)，old和new为{列名: 该列在这些行上的取值数组}"""
+        self._subscribers.append(callback)
+
+    def category_code(self, column, value):
+        """类别取值对应的编码，新取值会追加到类别表中"""
+        categories = self.categories[column]
+        if value not in categories:
+            categories.append(value)
+        return categories.index(value)
+
+    def column(self, column):
+        """返回某列的数组：数值列为取值，类别列为编码"""
+        return self.numeric[column] if column in self.numeric else self.codes[column]
+
+    def update(self, rows, **columns):
+        """批量修改若干行：update(rows, systolic_bp=[...], risk_level=[...])，每列给出与rows等长的新取值"""
+        rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+        with self.lock:
+            old, new = {}, {}
+            for column, values in columns.items():
+                values = np.atleast_1d(values)
+                array = self.numeric.get(column)
+                if array is None:
+                    # 先去重再查类别表，大批量更新时不必逐行编码
+                    array = self.codes[column]
+                    uniques, inverse = np.unique(values, return_inverse=True)
+                    codes = [self.category_code(column, value) for value in uniques.tolist()]
+                    encoded = np.array(codes, dtype=array.dtype)[inverse.ravel()]
+                else:
+                    encoded = values
+                old[column] = array[rows].copy()
+                array[rows] = encoded
+                new[column] = array[rows].copy()
+            # 按行一次写回所有列，每条记录只查找一次
+            names = list(columns)
+            records = self.records
+            for row, *values in zip(rows.tolist(), *[np.atleast_1d(columns[name]).tolist() for name in names]):
+                records[row].update(zip(names, values))
+            for callback in self._subscribers:
+                callback(rows, old, new)
@@ -0,0 +1,46 @@
+import numpy as np
+
+RISK_LEVELS = np.array(['低风险', '中风险', '高风险'])
+# 总分 <=5 为低风险，6-12 为中风险，>=13 为高风险
+RISK_LEVEL_BINS = [6, 13]
+
+
+def _points(values, thresholds, points):
+    """分段计分：thresholds从高到低，取值达到第一个阈值时得到对应分数，都未达到得0分"""
+    values = np.asarray(values)
+    return np.select([values >= threshold for threshold in thresholds], points, 0)
+
+
+def static_risk_scores(records):
+    """不随生命体征变化的评分部分：年龄、胆固醇、吸烟、糖尿病、BMI、运动和症状"""
+    age = np.array([record['age'] for record in records])
+    cholesterol = np.array([record['cholesterol'] for record in records])
+    bmi = np.array([record['bmi'] for record in records])
+    exercise_hours = np.array([record['exercise_hours'] for record in records])
+    smoking = np.array([record['smoking'] == '是' for record in records])
+    diabetes = np.array([record['diabetes'] == '是' for record in records])
+    chest_pain = np.array(['胸痛' in record['symptoms'] for record in records])
+    n_symptoms = np.array([len(record['symptoms']) for record in records])
+
+    scores = _points(age, [76, 66, 56, 46], [4, 3, 2, 1])
+    scores += _points(cholesterol, [280, 240, 200], [3, 2, 1])
+    scores += 3 * smoking + 3 * diabetes
+    scores += _points(bmi, [30, 25], [2, 1])
+    scores += np.where(exercise_hours < 2, 2, np.where(exercise_hours < 5, 1, 0))
+    scores += 3 * chest_pain + _points(n_symptoms, [3, 2], [2, 1])
+    return scores.astype(np.int16)
+
+
+def vital_risk_scores(systolic_bp, diastolic_bp, heart_rate):
+    """随生命体征变化的评分部分：收缩压、舒张压和心率（向量化）"""
+    heart_rate = np.asarray(heart_rate)
+    scores = _points(systolic_bp, [180, 160, 140], [4, 3, 2])
+    scores += _points(diastolic_bp, [110, 90], [3, 2])
+    scores += np.where((heart_rate > 100) | (heart_rate < 50), 2,
+                       np.where((heart_rate > 90) | (heart_rate < 60), 1, 0))
+    return scores.astype(np.int16)
+
+
+def risk_levels(scores):
+    """由总分得到风险等级"""
+    return RISK_LEVELS[np.digitize(scores, RISK_LEVEL_BINS)]
@@ -0,0 +1,122 @@
+import numpy as np
+
+# t-digest实现在项目根目录的quantile_sketch.py中，根目录由入口app.py加入模块搜索路径
+from quantile_sketch import TDigest
+
+SEGMENT_COLUMNS = ['risk_level', 'gender', 'treatment', 'smoking']
+VITAL_COLUMNS = ['systolic_bp', 'diastolic_bp', 'heart_rate', 'cholesterol']
+
+
+class SegmentSketches:
+    """按分段（风险等级 × 性别 × 治疗方案 × 吸烟）为每项生命体征维护一个t-digest
+
+    查询时合并所有匹配分段的草图，耗时只与分段数和草图大小有关，与患者数量无关。
+    t-digest不支持删除：患者取值变化时新值直接加入所在分段，旧值计为原分段的过期值。
+    过期值按分段计数，某个分段的过期值超过该分段患者数的rebuild_fraction时，只从列式存储重建这个分段，
+    患者集中移入或移出某个小分段时，过期值也不会在这个分段里累积到影响分位数的程度。
+    每个分段当前的患者数单独精确维护（草图中的样本数包含过期值），查询时报告的是这个数。
+    """
+
+    def __init__(self, store, vitals=VITAL_COLUMNS, segments=SEGMENT_COLUMNS, compression=100,
+                 rebuild_fraction=0.1):
+        self.store = store
+        self.vitals = list(vitals)
+        self.segments = list(segments)
+        self.compression = compression
+        self.rebuild_fraction = rebuild_fraction
+        self.rebuild()
+        store.subscribe(self._on_change)
+
+    def _segment_codes(self, rows=None):
+        if rows is None:
+            return np.column_stack([self.store.codes[column] for column in self.segments])
+        return np.column_stack([self.store.codes[column][rows] for column in self.segments])
+
+    def _pack(self, codes):
+        """各分段字段的编码合成一个整数键，比np.unique(axis=0)按行去重快一个数量级"""
+        sizes = [len(self.store.categories[column]) for column in self.segments]
+        return np.ravel_multi_index(tuple(np.asarray(codes).T), sizes), sizes
+
+    def _add(self, codes, rows):
+        """按分段分组后把这些行的取值加入对应的草图"""
+        packed, sizes = self._pack(codes)
+        order = np.argsort(packed, kind='stable')
+        keys, starts = np.unique(packed[order], return_index=True)
+        bounds = np.r_[starts, len(order)]
+        for j, key in enumerate(zip(*(index.tolist() for index in np.unravel_index(keys, sizes)))):
+            group = rows[order[bounds[j]:bounds[j + 1]]]
+            self.counts[key] = self.counts.get(key, 0) + len(group)
+            digests = self.sketches.setdefault(key, {vital: TDigest(self.compression) for vital in self.vitals})
+            for vital in self.vitals:
+                digests[vital].update(self.store.numeric[vital][group])
+
+    def rebuild(self):
+        """从列式存储重新构建全部草图"""
+        with self.store.lock:
+            self.sketches = {}
+            self.counts = {}
+            self._add(self._segment_codes(), np.arange(len(self.store)))
+            self.stale = {}
+
+    def _rebuild_segments(self, keys):
+        """只重建keys这些分段的草图：扫描一遍分段编码找出其中的行，重新加入"""
+        for key in keys:
+            self.sketches.pop(key, None)
+            self.counts.pop(key, None)
+            self.stale.pop(key, None)
+        # 直接按列累加出全体患者的分段键（与_pack的结果相同），不必先拼出 (患者数, 字段数) 的编码矩阵
+        wanted, sizes = self._pack(keys)
+        packed = np.zeros(len(self.store), dtype=np.int64)
+        for column, size in zip(self.segments, sizes):
+            packed *= size
+            packed += self.store.codes[column]
+        rows = np.flatnonzero(np.isin(packed, wanted, kind='table'))
+        self._add(self._segment_codes(rows), rows)
+
+    def _on_change(self, rows, old, new):
+        if not any(column in new for column in self.vitals + self.segments):
+            return
+        # 变化前所在分段的人数减一、旧值计为该分段的过期值，变化后所在分段的人数在_add中加一
+        previous = self._segment_codes(rows)
+        for i, column in enumerate(self.segments):
+            if column in old:
+                previous[:, i] = old[column]
+        keys, removed = np.unique(previous, axis=0, return_counts=True)
+        expired = []
+        for key, n in zip(map(tuple, keys.tolist()), removed.tolist()):
+            self.counts[key] -= n
+            self.stale[key] = self.stale.get(key, 0) + n
+            if self.stale[key] > self.rebuild_fraction * self.counts[key]:
+                expired.append(key)
+        self._add(self._segment_codes(rows), rows)
+        if expired:
+            self._rebuild_segments(expired)
+
+    def percentiles(self, vital, q, **filters):
+        """合并满足filters（如risk_level='高风险', smoking='是'）的分段草图
+
+        返回(当前患者数, 合并草图中过期值的比例, 各分位数)
+        """
+        if vital not in self.vitals:
+            raise ValueError(f"不支持的指标: {vital}，可选: {', '.join(self.vitals)}")
+        unknown = set(filters) - set(self.segments)
+        if unknown:
+            raise ValueError(f"不支持的分段字段: {', '.join(sorted(unknown))}，可选: {', '.join(self.segments)}")
+
+        with self.store.lock:
+            wanted = {}
+            for column, value in filters.items():
+                if value not in self.store.categories[column]:
+                    return 0, 0.0, [None] * len(q)
+                wanted[self.segments.index(column)] = self.store.categories[column].index(value)
+
+            merged = TDigest(self.compression)
+            count = stale = 0
+            for key, digests in self.sketches.items():
+                if all(key[i] == code for i, code in wanted.items()):
+                    merged.merge(digests[vital])
+                    count += self.counts.get(key, 0)
+                    stale += self.stale.get(key, 0)
+        if count == 0 or merged.count == 0:
+            return 0, 0.0, [None] * len(q)
+        return count, stale / merged.count, [float(v) for v in merged.quantile(np.asarray(q) / 100)]
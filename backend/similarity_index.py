@@ -0,0 +1,149 @@
+import threading
+import time
+import numpy as np
+from sklearn.neighbors import KDTree
+
+SIMILARITY_FEATURES = ['age', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'cholesterol', 'bmi', 'exercise_hours']
+
+
+class SimilarityIndex:
+    """按标准化后的生命体征与风险因素查找相似患者
+
+    患者数少于brute_force_below时直接对整个标准化矩阵做向量化的暴力搜索；
+    否则建KD树（特征只有7维，KD树的查询比BallTree快得多）。
+    树建好之后发生变化的行记为“脏行”：查询时从树中取k+1个近邻，结果里有脏行就按脏行数多取，
+    直到去掉脏行后仍有k+1个；脏行按当前取值暴力计算距离，两份候选合并后取前k个，结果与重建后一致。
+    脏行超过患者数的rebuild_fraction时在后台线程重建树，重建期间查询继续使用旧树。
+    建树期间持有GIL，两次重建的间隔至少为min_rebuild_interval秒、且至少是上次建树耗时的1/max_rebuild_share倍，
+    建树占用的时间不超过max_rebuild_share，模拟器和查询不会被频繁的重建拖慢。
+    """
+
+    def __init__(self, store, features=SIMILARITY_FEATURES, brute_force_below=20000, rebuild_fraction=0.01,
+                 min_rebuild_interval=1.0, max_rebuild_share=0.2, leaf_size=40):
+        self.store = store
+        self.features = list(features)
+        self.brute_force_below = brute_force_below
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild_interval = min_rebuild_interval
+        self.max_rebuild_share = max_rebuild_share
+        self.leaf_size = leaf_size
+        self._sequence = 0
+        self._changed_at = np.zeros(len(store), dtype=np.int64)
+        self._rebuilding = None
+        self._built_at = time.monotonic()
+        self._build_seconds = 0.0
+        with store.lock:
+            raw, sequence = self._snapshot()
+        self._install(*self._build(raw), sequence)
+        store.subscribe(self._on_change)
+
+    def _snapshot(self):
+        """在store.lock内复制当前的原始特征矩阵"""
+        return np.column_stack([self.store.numeric[f] for f in self.features]), self._sequence
+
+    def _build(self, raw):
+        """标准化并建树，耗时较长，不持有锁"""
+        start = time.monotonic()
+        mean = raw.mean(axis=0)
+        scale = raw.std(axis=0)
+        scale[scale == 0] = 1.0
+        scaled = (raw - mean) / scale
+        tree = None
+        if len(scaled) >= self.brute_force_below:
+            tree = KDTree(scaled.copy(), leaf_size=self.leaf_size)
+        self._built_at = time.monotonic()
+        self._build_seconds = self._built_at - start
+        return mean, scale, scaled, tree
+
+    def _install(self, mean, scale, scaled, tree, sequence):
+        """换上新建的索引；快照之后又发生变化的行按当前取值重新标准化，并继续记为脏行"""
+        changed = np.flatnonzero(self._changed_at > sequence)
+        if len(changed):
+            scaled[changed] = (self._raw(changed) - mean) / scale
+        self.mean, self.scale, self.scaled, self.tree = mean, scale, scaled, tree
+        # 脏行的行号和标准化取值连续存放在缓冲区中，查询时不必从整个矩阵里按行号收集；
+        # _dirty_position为每行在缓冲区中的位置，不是脏行时为-1
+        self._dirty_position = np.full(len(scaled), -1, dtype=np.int64)
+        self._dirty_rows = np.empty(0, dtype=np.int64)
+        self._dirty_scaled = np.empty((0, scaled.shape[1]))
+        self.n_dirty = 0
+        if tree is not None:
+            self._mark_dirty(changed)
+
+    def _mark_dirty(self, rows):
+        """把rows记为脏行，并在缓冲区中写入它们当前的标准化取值"""
+        rows = np.unique(rows)
+        added = rows[self._dirty_position[rows] < 0]
+        end = self.n_dirty + len(added)
+        if end > len(self._dirty_rows):
+            capacity = max(2 * end, 1024)
+            dirty_rows = np.empty(capacity, dtype=np.int64)
+            dirty_scaled = np.empty((capacity, self.scaled.shape[1]))
+            dirty_rows[:self.n_dirty] = self._dirty_rows[:self.n_dirty]
+            dirty_scaled[:self.n_dirty] = self._dirty_scaled[:self.n_dirty]
+            self._dirty_rows, self._dirty_scaled = dirty_rows, dirty_scaled
+        self._dirty_position[added] = np.arange(self.n_dirty, end)
+        self._dirty_rows[self.n_dirty:end] = added
+        self.n_dirty = end
+        self._dirty_scaled[self._dirty_position[rows]] = self.scaled[rows]
+
+    def _raw(self, rows):
+        return np.column_stack([self.store.numeric[f][rows] for f in self.features])
+
+    def _on_change(self, rows, old, new):
+        if not any(column in new for column in self.features):
+            return
+        self._sequence += 1
+        self._changed_at[rows] = self._sequence
+        self.scaled[rows] = (self._raw(rows) - self.mean) / self.scale
+        if self.tree is None:
+            return
+        self._mark_dirty(rows)
+        if self.n_dirty > self.rebuild_fraction * len(self.scaled) and self._rebuilding is None:
+            interval = max(self.min_rebuild_interval, self._build_seconds / self.max_rebuild_share)
+            if time.monotonic() - self._built_at >= interval:
+                self._rebuilding = threading.Thread(target=self._rebuild, daemon=True)
+                self._rebuilding.start()
+
+    def _rebuild(self):
+        with self.store.lock:
+            raw, sequence = self._snapshot()
+        built = self._build(raw)
+        with self.store.lock:
+            self._install(*built, sequence)
+            self._rebuilding = None
+
+    def similar(self, row, k=10):
+        """与第row行最相似的k名患者（不含自身），返回[(行号, 距离)]，按距离从近到远排列"""
+        with self.store.lock:
+            query = self.scaled[row]
+            if self.tree is None:
+                candidates = np.arange(len(self.scaled))
+                distances = np.sqrt(((self.scaled - query) ** 2).sum(axis=1))
+            else:
+                # 树中的脏行坐标已过期：去掉后不足k+1个时，按这次结果里的脏行数多取，再查一次
+                n_query = min(k + 1, len(self.scaled))
+                while True:
+                    tree_distances, tree_rows = self.tree.query(query[None, :], k=n_query)
+                    tree_distances, tree_rows = tree_distances[0], tree_rows[0]
+                    keep = self._dirty_position[tree_rows] < 0
+                    n_stale = n_query - int(keep.sum())
+                    if n_query - n_stale >= k + 1 or n_query == len(self.scaled):
+                        break
+                    n_query = min(k + 1 + n_stale, len(self.scaled))
+                # 脏行暴力计算距离，只保留最近的k+1个再与树的结果合并
+                dirty = self._dirty_rows[:self.n_dirty]
+                diff = self._dirty_scaled[:self.n_dirty] - query
+                dirty_distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+                if len(dirty) > k + 1:
+                    nearest = np.argpartition(dirty_distances, k)[:k + 1]
+                    dirty, dirty_distances = dirty[nearest], dirty_distances[nearest]
+                candidates = np.r_[tree_rows[keep], dirty]
+                distances = np.r_[tree_distances[keep], dirty_distances]
+
+        mask = candidates != row
+        candidates, distances = candidates[mask], distances[mask]
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        nearest = nearest[np.lexsort((candidates[nearest], distances[nearest]))]
+        return [(int(candidates[i]), float(distances[i])) for i in nearest]
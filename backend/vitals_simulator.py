@@ -0,0 +1,132 @@
+import argparse
+import threading
+import time
+import numpy as np
+
+from risk_scoring import static_risk_scores, vital_risk_scores, risk_levels
+
+SIMULATED_VITALS = ['systolic_bp', 'diastolic_bp', 'heart_rate']
+# 各指标每个周期随机游走的步长（标准差）、生理范围，以及步长之间的相关系数
+STEP_STD = np.array([4.0, 2.5, 3.0])
+VITAL_BOUNDS = np.array([[70, 220], [40, 130], [35, 180]])
+STEP_CORRELATION = np.array([
+    [1.0, 0.7, 0.3],
+    [0.7, 1.0, 0.2],
+    [0.3, 0.2, 1.0],
+])
+
+
+class VitalsSimulator:
+    """向量化的生命体征模拟器，直接驱动PatientStore
+
+    每个周期随机选出mutation_fraction比例的患者，收缩压、舒张压和心率按相关的随机游走变化
+    （步长经Cholesky分解引入相关性），并以mean_reversion的力度回归各自的基线、裁剪到生理范围。
+    风险评分和风险等级按与生成数据时相同的规则（risk_scoring）向量化重算，
+    整批通过一次store.update()写回，订阅者（分段草图、排行榜、相似患者索引、异常检测）随之增量更新。
+    """
+
+    def __init__(self, store, tick_rate=1.0, mutation_fraction=0.01, mean_reversion=0.1,
+                 step_std=STEP_STD, correlation=STEP_CORRELATION, random_state=None):
+        self.store = store
+        self.tick_rate = tick_rate
+        self.mutation_fraction = mutation_fraction
+        self.mean_reversion = mean_reversion
+        self.step_std = np.asarray(step_std, dtype=np.float64)
+        self._cholesky = np.linalg.cholesky(np.asarray(correlation, dtype=np.float64))
+        self._rng = np.random.default_rng(random_state)
+        with store.lock:
+            self.baseline = np.column_stack([store.numeric[vital] for vital in SIMULATED_VITALS])
+            # 不随生命体征变化的评分部分只在启动时计算一次
+            self._static_scores = static_risk_scores(store.records)
+        self.ticks = 0
+        self.updates = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def step(self):
+        """执行一个周期，返回被修改的行号"""
+        n_patients = len(self.store)
+        n_rows = max(1, int(round(n_patients * self.mutation_fraction)))
+        # 有放回抽样再去重，避免对全部患者做一次排列
+        rows = np.unique(self._rng.integers(0, n_patients, n_rows))
+
+        with self.store.lock:
+            current = np.column_stack([self.store.numeric[vital][rows] for vital in SIMULATED_VITALS])
+            steps = self._rng.standard_normal((len(rows), len(SIMULATED_VITALS))) @ self._cholesky.T
+            current += self.mean_reversion * (self.baseline[rows] - current) + steps * self.step_std
+            vitals = np.clip(np.rint(current), VITAL_BOUNDS[:, 0], VITAL_BOUNDS[:, 1]).astype(np.int64)
+            systolic_bp, diastolic_bp, heart_rate = vitals.T
+            # 舒张压至少比收缩压低20
+            diastolic_bp = np.minimum(diastolic_bp, systolic_bp - 20)
+
+            risk_score = self._static_scores[rows] + vital_risk_scores(systolic_bp, diastolic_bp, heart_rate)
+            risk_level = risk_levels(risk_score)
+            self.store.update(rows, systolic_bp=systolic_bp, diastolic_bp=diastolic_bp, heart_rate=heart_rate,
+                              risk_score=risk_score, risk_level=risk_level)
+        self.ticks += 1
+        self.updates += len(rows)
+        return rows
+
+    def run(self, duration=None):
+        """按tick_rate持续执行，直到stop()或经过duration秒；跟不上节拍时不补跑，立即开始下一周期"""
+        deadline = None if duration is None else time.monotonic() + duration
+        next_tick = time.monotonic()
+        while not self._stopped.is_set() and (deadline is None or time.monotonic() < deadline):
+            self.step()
+            next_tick = max(next_tick + 1.0 / self.tick_rate, time.monotonic())
+            self._stopped.wait(next_tick - time.monotonic())
+
+    def start(self):
+        """在后台线程中运行"""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == '__main__':
+    # 容量测试：python vitals_simulator.py --patients 1000000 --tick-rate 10 --fraction 0.01 --subscribers all
+    parser = argparse.ArgumentParser(description='生命体征模拟器容量测试')
+    parser.add_argument('--patients', type=int, default=100000)
+    parser.add_argument('--tick-rate', type=float, default=10.0)
+    parser.add_argument('--fraction', type=float, default=0.01)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--subscribers', default='none',
+                        help='逗号分隔: sketches,leaderboard,similar,alerts，或all/none')
+    args = parser.parse_args()
+
+    from app import generate_patient_data
+    from patient_store import PatientStore
+
+    print(f'生成 {args.patients:,} 名患者...')
+    store = PatientStore(generate_patient_data(args.patients))
+    subscribers = {'sketches', 'leaderboard', 'similar', 'alerts'} if args.subscribers == 'all' else \
+        set(args.subscribers.split(',')) - {'none', ''}
+    if 'sketches' in subscribers:
+        from segment_sketches import SegmentSketches
+        SegmentSketches(store)
+    if 'leaderboard' in subscribers:
+        from leaderboard import RiskLeaderboard
+        RiskLeaderboard(store)
+    if 'similar' in subscribers:
+        from similarity_index import SimilarityIndex
+        SimilarityIndex(store)
+    if 'alerts' in subscribers:
+        from anomaly_detector import AnomalyDetector
+        AnomalyDetector(np.vstack([store.numeric['systolic_bp'], store.numeric['heart_rate']]),
+                        ids=store.ids).watch(store)
+
+    simulator = VitalsSimulator(store, tick_rate=args.tick_rate, mutation_fraction=args.fraction, random_state=42)
+    target = args.tick_rate * args.patients * args.fraction
+    start = time.perf_counter()
+    simulator.run(args.duration)
+    elapsed = time.perf_counter() - start
+    print(f'订阅者: {", ".join(sorted(subscribers)) or "无"}')
+    print(f'目标: {target:,.0f} 次更新/秒，实际: {simulator.updates / elapsed:,.0f} 次更新/秒'
+          f'（{simulator.ticks} 个周期，平均每周期 {elapsed / simulator.ticks * 1000:.1f} ms）')
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from streaming_stats import StreamingCorrelation
+
+
+def iter_parquet_chunks(path, columns=None, skip_last=0):
+    """逐个行组读取Parquet文件，skip_last个末尾行组留作测试集不参与训练"""
+    parquet_file = pq.ParquetFile(path)
+    for i in range(parquet_file.num_row_groups - skip_last):
+        yield parquet_file.read_row_group(i, columns=columns).to_pandas()
+
+
+def read_holdout(path, columns=None, n_groups=1):
+    """读取末尾的n_groups个行组作为测试集"""
+    parquet_file = pq.ParquetFile(path)
+    groups = range(parquet_file.num_row_groups - n_groups, parquet_file.num_row_groups)
+    return parquet_file.read_row_groups(list(groups), columns=columns).to_pandas()
+
+
+def parquet_sample(path, n_samples, columns=None, skip_last=0, random_state=42):
+    """从各行组按比例抽样，得到可放入内存的代表性子集（用于可视化和背景集）"""
+    parquet_file = pq.ParquetFile(path)
+    n_groups = parquet_file.num_row_groups - skip_last
+    total = sum(parquet_file.metadata.row_group(i).num_rows for i in range(n_groups))
+    fraction = min(1.0, n_samples / total)
+
+    rng = np.random.RandomState(random_state)
+    samples = []
+    for chunk in iter_parquet_chunks(path, columns, skip_last):
+        samples.append(chunk.iloc[rng.rand(len(chunk)) < fraction])
+    return pd.concat(samples, ignore_index=True)
+
+
+def fit_forest_chunked(forest, path, features, target, trees_per_chunk=20, skip_last=1):
+    """逐个行组增量训练随机森林：借助warm_start，每读入一个行组就在其上补种trees_per_chunk棵树"""
+    forest = clone(forest).set_params(warm_start=True, n_estimators=0)
+    classes = None
+    for chunk in iter_parquet_chunks(path, features + [target], skip_last):
+        # 类别不全的行组会改变classes_，导致新旧树的输出维度不一致，直接跳过
+        chunk_classes = np.unique(chunk[target])
+        if classes is None:
+            classes = chunk_classes
+        elif not np.array_equal(chunk_classes, classes):
+            continue
+
+        forest.set_params(n_estimators=forest.n_estimators + trees_per_chunk)
+        forest.fit(chunk[features], chunk[target])
+    return forest
+
+
+def fit_scaler_chunked(path, features):
+    """逐块partial_fit标准化器"""
+    scaler = StandardScaler()
+    for chunk in iter_parquet_chunks(path, features):
+        scaler.partial_fit(chunk[features].values)
+    return scaler
+
+
+def fit_kmeans_chunked(path, features, scaler, n_clusters=3, n_epochs=1, random_state=42):
+    """逐块partial_fit小批量K-means，每块先用已拟合的标准化器转换"""
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3)
+    for _ in range(n_epochs):
+        for chunk in iter_parquet_chunks(path, features):
+            kmeans.partial_fit(scaler.transform(chunk[features].values))
+    return kmeans
+
+
+def _read_row_groups(path, groups, columns):
+    """逐个读取指定的行组"""
+    parquet_file = pq.ParquetFile(path)
+    for i in groups:
+        yield parquet_file.read_row_group(i, columns=columns).to_pandas()
+
+
+def _correlation_partial(path, columns, groups, spearman):
+    """一个工作进程内：累计所分配行组的均值和离差积矩阵，计算Spearman时还累计分位数草图"""
+    # 秩在草图合并定型后由_rank_partial统一计算，这里不做单遍的秩
+    stats = StreamingCorrelation(columns, spearman=spearman, single_pass_ranks=False)
+    for chunk in _read_row_groups(path, groups, columns):
+        stats.update(chunk)
+    return stats
+
+
+def _rank_partial(path, columns, groups, stats):
+    """一个工作进程内：用合并后的草图计算所分配行组的秩协方差"""
+    return stats.rank_pass(_read_row_groups(path, groups, columns)).ranks
+
+
+def chunked_correlation(path, columns, method='pearson', n_jobs=-1):
+    """逐块累计统计量计算相关系数矩阵，内存占用与样本数无关
+
+    行组分给多个工作进程处理，各进程的统计量用并行合并公式合并；
+    method为'spearman'时在草图合并定型后再读一遍数据，用近似秩计算相关系数。
+    """
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"不支持的相关系数: {method}，可选: pearson, spearman")
+    n_groups = pq.ParquetFile(path).num_row_groups
+    n_workers = min(effective_n_jobs(n_jobs), n_groups)
+    splits = [list(groups) for groups in np.array_split(np.arange(n_groups), n_workers)]
+
+    partials = Parallel(n_jobs=n_workers)(
+        delayed(_correlation_partial)(path, columns, groups, method == 'spearman') for groups in splits
+    )
+    stats = partials[0]
+    for partial in partials[1:]:
+        stats.merge(partial)
+
+    if method == 'pearson':
+        return stats.pearson()
+
+    ranks = Parallel(n_jobs=n_workers)(
+        delayed(_rank_partial)(path, columns, groups, stats) for groups in splits
+    )
+    stats.ranks = ranks[0]
+    for partial in ranks[1:]:
+        stats.ranks.merge(partial)
+    return stats.spearman()
@@ -0,0 +1,62 @@
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import calinski_harabasz_score, pairwise_distances, silhouette_score
+
+# 样本数超过该值时改用小批量K-means
+MINI_BATCH_THRESHOLD = 50000
+
+
+def simplified_silhouette(X, labels, centers):
+    """简化轮廓系数：用到本簇中心和最近的其他簇中心的距离代替点对距离，复杂度O(n·k)"""
+    distances = pairwise_distances(X, centers)
+    a = distances[np.arange(len(X)), labels]
+    distances[np.arange(len(X)), labels] = np.inf
+    b = distances.min(axis=1)
+    return float(np.mean((b - a) / np.maximum(np.maximum(a, b), 1e-12)))
+
+
+def _score_k(X, k, mini_batch, silhouette_samples, n_init, random_state):
+    """在一个工作进程中拟合k个簇并计算各项指标"""
+    start = time.perf_counter()
+    if mini_batch:
+        model = MiniBatchKMeans(n_clusters=k, n_init=n_init, batch_size=4096, random_state=random_state)
+    else:
+        model = KMeans(n_clusters=k, n_init=n_init, random_state=random_state)
+    labels = model.fit_predict(X)
+    fit_time = time.perf_counter() - start
+
+    # 轮廓系数需要点对距离，只在抽样子集上计算；其余指标在全部样本上计算
+    sample_size = min(silhouette_samples, len(X)) if silhouette_samples else None
+    return {
+        'k': k,
+        'inertia': model.inertia_,
+        'silhouette': silhouette_score(X, labels, sample_size=sample_size, random_state=random_state),
+        'simplified_silhouette': simplified_silhouette(X, labels, model.cluster_centers_),
+        'calinski_harabasz': calinski_harabasz_score(X, labels),
+        'fit_time': fit_time,
+    }
+
+
+def select_n_clusters(X, k_values=range(2, 11), mini_batch=None, silhouette_samples=10000, n_init=3,
+                      n_jobs=-1, random_state=42):
+    """并行扫描簇数k，返回每个k的指标曲线（按k排序的DataFrame）
+
+    mini_batch为None时，样本数超过MINI_BATCH_THRESHOLD自动使用MiniBatchKMeans。
+    每个k在独立的工作进程中拟合，大数组以内存映射方式共享给各进程。
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if mini_batch is None:
+        mini_batch = len(X) > MINI_BATCH_THRESHOLD
+
+    rows = Parallel(n_jobs=n_jobs)(
+        delayed(_score_k)(X, k, mini_batch, silhouette_samples, n_init, random_state) for k in k_values
+    )
+    return pd.DataFrame(rows).sort_values('k').reset_index(drop=True)
+
+
+def best_n_clusters(curve, metric='silhouette'):
+    """按指定指标取最优的k（各指标均为越大越好）"""
+    return int(curve.loc[curve[metric].idxmax(), 'k'])
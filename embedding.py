@@ -0,0 +1,66 @@
+import hashlib
+import os
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
+
+
+def embedding_key(X, **params):
+    """按数据内容和参数计算缓存键，数据或参数任何变化都会得到新的键"""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    digest = hashlib.sha1(X.tobytes())
+    digest.update(repr((X.shape, sorted(params.items()))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def interpolate_embedding(X_reduced, sample_index, sample_embedding, n_neighbors=10):
+    """把未参与t-SNE的点放到其在PCA空间中k个最近样本点嵌入坐标的距离倒数加权平均处"""
+    embedding = np.empty((len(X_reduced), sample_embedding.shape[1]))
+    embedding[sample_index] = sample_embedding
+
+    rest = np.setdiff1d(np.arange(len(X_reduced)), sample_index)
+    if len(rest):
+        # 样本点只有几千个，暴力搜索走矩阵乘法，比KD树快
+        nn = NearestNeighbors(n_neighbors=min(n_neighbors, len(sample_index)), algorithm='brute')
+        nn.fit(X_reduced[sample_index])
+        distances, neighbors = nn.kneighbors(X_reduced[rest])
+        weights = 1.0 / np.maximum(distances, 1e-12)
+        weights /= weights.sum(axis=1, keepdims=True)
+        embedding[rest] = np.einsum('ij,ijk->ik', weights, sample_embedding[neighbors])
+    return embedding
+
+
+def embed_patients(X, n_components=2, pca_components=50, max_tsne_samples=5000, perplexity=30,
+                   n_neighbors=10, random_state=42, cache_dir='.embedding_cache'):
+    """可扩展的t-SNE嵌入：先PCA降维，再对至多max_tsne_samples个抽样点做Barnes-Hut t-SNE，
+    其余点按最近邻插值放置
+
+    结果按数据哈希缓存在cache_dir中，重新绘图时不会重复计算；cache_dir为None时不缓存。
+    """
+    X = np.asarray(X, dtype=np.float64)
+    params = dict(n_components=n_components, pca_components=pca_components, max_tsne_samples=max_tsne_samples,
+                  perplexity=perplexity, n_neighbors=n_neighbors, random_state=random_state)
+    cache_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, embedding_key(X, **params) + '.npy')
+        if os.path.exists(cache_path):
+            return np.load(cache_path)
+
+    X_reduced = PCA(n_components=min(pca_components, *X.shape), random_state=random_state).fit_transform(X)
+
+    rng = np.random.RandomState(random_state)
+    if len(X) > max_tsne_samples:
+        sample_index = np.sort(rng.choice(len(X), max_tsne_samples, replace=False))
+    else:
+        sample_index = np.arange(len(X))
+
+    tsne = TSNE(n_components=n_components, perplexity=min(perplexity, (len(sample_index) - 1) / 3),
+                method='barnes_hut', init='pca', random_state=random_state)
+    sample_embedding = tsne.fit_transform(X_reduced[sample_index])
+    embedding = interpolate_embedding(X_reduced, sample_index, sample_embedding, n_neighbors)
+
+    if cache_path:
+        np.save(cache_path, embedding)
+    return embedding
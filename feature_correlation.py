@@ -4,6 +4,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import StandardScaler
 import os
+from chunked_training import parquet_sample, chunked_correlation
 
 # 设置随机种子以确保结果可重现
 np.random.seed(42)
@@ -78,11 +79,21 @@ def generate_health_data(n_samples=500):
     
     return data
 
-# 生成数据
-df = generate_health_data(500)
-
-# 计算相关性矩阵
-correlation = df.corr()
+# 超出内存的大数据集：设置环境变量CARDIOVIZ_PARQUET指向Parquet文件后，相关性矩阵由多个进程逐个行组累计、合并，
+# 分布图只使用一个抽样子集
+chunked_path = os.environ.get('CARDIOVIZ_PARQUET')
+# 相关系数类型：pearson（默认）或spearman（大数据集上用分位数草图近似秩）
+corr_method = os.environ.get('CARDIOVIZ_CORR', 'pearson')
+
+if chunked_path:
+    df = parquet_sample(chunked_path, 5000)
+    correlation = chunked_correlation(chunked_path, list(df.columns), method=corr_method)
+else:
+    # 生成数据
+    df = generate_health_data(500)
+
+    # 计算相关性矩阵
+    correlation = df.corr(method=corr_method)
 
 # 创建热图可视化
 plt.figure(figsize=(12, 10))
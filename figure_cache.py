@@ -0,0 +1,84 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import diskcache
+import plotly.io as pio
+
+# SharedFigureCache.get_or_build依次报告的构建阶段
+BUILD_STAGES = ['等待构建锁', '构建图表', '序列化', '写入缓存']
+
+
+class FigureCache:
+    """Dash图表缓存：按(面板, 数据版本, 回调输入)保存已序列化的图表，所有会话共享
+
+    缓存的是plotly JSON解析后的纯Python字典，命中时Dash只需做一次普通的JSON编码，
+    不必重新分组数据、构建Figure对象和转换numpy数组。
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token(panel, version, inputs=None):
+        """生成缓存键，同时作为客户端已渲染版本的标记"""
+        digest = hashlib.md5(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+        return f'{panel}:{version}:{digest}'
+
+    def get_or_build(self, token, builder):
+        """命中缓存时直接返回，否则调用builder()构建图表并缓存"""
+        with self._lock:
+            if token in self._entries:
+                self._entries.move_to_end(token)
+                return self._entries[token]
+
+        figure = json.loads(pio.to_json(builder(), validate=False))
+
+        with self._lock:
+            self._entries[token] = figure
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+
+class SharedFigureCache:
+    """跨进程共享的图表缓存，基于diskcache，供后台回调的工作进程使用
+
+    同一token的构建用磁盘锁串行化：多个会话同时请求同一份图表时只有一个进程真正构建，
+    其余进程等待锁释放后直接读取结果。
+    """
+
+    def __init__(self, cache, namespace='', expire=600, lock_expire=300):
+        self.cache = cache
+        self.namespace = namespace
+        self.expire = expire
+        self.lock_expire = lock_expire
+
+    def get_or_build(self, token, builder, progress=None):
+        """与FigureCache.get_or_build相同，结果保存在磁盘缓存中
+
+        传入progress时，每进入BUILD_STAGES中的一个阶段调用一次progress(已完成阶段数, 阶段总数, 阶段名)，
+        完成时调用progress(阶段总数, 阶段总数, '完成')；命中缓存时只报告完成。
+        """
+        def report(stage):
+            if progress is not None:
+                label = BUILD_STAGES[stage] if stage < len(BUILD_STAGES) else '完成'
+                progress(stage, len(BUILD_STAGES), label)
+
+        key = f'figure:{self.namespace}:{token}'
+        figure = self.cache.get(key)
+        if figure is None:
+            report(0)
+            with diskcache.Lock(self.cache, f'lock:{self.namespace}:{token}', expire=self.lock_expire):
+                figure = self.cache.get(key)
+                if figure is None:
+                    report(1)
+                    built = builder()
+                    report(2)
+                    figure = json.loads(pio.to_json(built, validate=False))
+                    report(3)
+                    self.cache.set(key, figure, expire=self.expire)
+        report(len(BUILD_STAGES))
+        return figure
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+import networkx as nx
+
+
+def graph_structure_key(G):
+    """按节点集合和边集合计算图结构的哈希，与边权无关"""
+    nodes = sorted(map(str, G.nodes()))
+    edges = sorted(sorted((str(u), str(v))) for u, v in G.edges())
+    return hashlib.sha1(json.dumps([nodes, edges], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def layout_params_key(**params):
+    """布局参数（k、seed、scale、iterations、weight等）的哈希，参数不同的布局不能互相复用"""
+    return hashlib.sha1(json.dumps(sorted(params.items()), default=str).encode('utf-8')).hexdigest()
+
+
+def graph_weights_key(G, weight='weight'):
+    """按边权计算哈希，用于判断结构相同的图是否只是边权发生了变化"""
+    if weight is None:
+        return None
+    weights = sorted((*sorted((str(u), str(v))), float(w)) for u, v, w in G.edges(data=weight, default=1.0))
+    return hashlib.sha1(json.dumps(weights, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class LayoutCache:
+    """以图结构哈希为键的力导向布局缓存
+
+    - 结构和边权都没变：直接返回缓存的坐标
+    - 结构没变、边权变了：以缓存坐标为初始位置，只做少量迭代
+    - 只有少数节点或边变化：沿用上一次布局中共有节点的坐标，邻居未变的节点固定不动，只移动受影响的节点
+    缓存键同时包含布局参数；热启动只沿用参数相同、且至少一半节点相同的上一次布局。
+    传入path时缓存会持久化为JSON文件（先写临时文件再替换），脚本多次运行之间也能复用；
+    文件被其他进程更新后，下一次查询前会重新读取，因此多个工作进程之间也能共享。
+    每个调用方应使用自己的文件，互不干扰。
+    """
+
+    def __init__(self, path=None, max_entries=32, warm_iterations=15):
+        self.path = path
+        self.max_entries = max_entries
+        self.warm_iterations = warm_iterations
+        self._entries = OrderedDict()
+        self._last_key = None
+        self._mtime = None
+        self._reload()
+
+    def _reload(self):
+        """文件自上次读取或写入后被修改过时重新读取"""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            entries, last_key = OrderedDict(saved['entries']), saved['last_key']
+        except (OSError, ValueError, KeyError, TypeError):
+            # 文件损坏或格式不对时保留内存中的缓存，下次保存时覆盖
+            self._mtime = mtime
+            return
+        # 本进程里还没写入文件的条目保留下来
+        for key, entry in self._entries.items():
+            entries.setdefault(key, entry)
+        self._entries, self._last_key, self._mtime = entries, last_key, mtime
+
+    def spring_layout(self, G, weight='weight', iterations=50, **kwargs):
+        """带缓存与热启动的nx.spring_layout，额外参数原样传给networkx"""
+        self._reload()
+        params = layout_params_key(weight=weight, iterations=iterations, **kwargs)
+        key = f'{graph_structure_key(G)}-{params}'
+        weights = graph_weights_key(G, weight)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry['weights'] == weights:
+            self._entries.move_to_end(key)
+            self._last_key = key
+            return {node: np.array(entry['pos'][str(node)]) for node in G}
+
+        previous = self._warm_start_entry(G, params) if entry is None else None
+        if entry is not None:
+            pos = nx.spring_layout(G, pos=self._positions(entry, G), weight=weight,
+                                   iterations=self.warm_iterations, **kwargs)
+        elif previous is not None:
+            initial = self._positions(previous, G)
+            fixed = [node for node in initial
+                     if sorted(map(str, G[node])) == previous['adjacency'].get(str(node))]
+            # 所有节点都被固定时不再迭代
+            if len(fixed) == G.number_of_nodes():
+                pos = {node: np.array(xy) for node, xy in initial.items()}
+            else:
+                pos = nx.spring_layout(G, pos=initial or None, fixed=fixed or None, weight=weight,
+                                       iterations=self.warm_iterations if initial else iterations, **kwargs)
+        else:
+            pos = nx.spring_layout(G, weight=weight, iterations=iterations, **kwargs)
+
+        self._store(key, params, weights, G, pos)
+        return pos
+
+    def _warm_start_entry(self, G, params):
+        """上一次布局参数相同且与当前图共有至少一半节点时，返回它用于热启动"""
+        previous = self._entries.get(self._last_key)
+        if previous is None or previous.get('params') != params:
+            return None
+        shared = sum(str(node) in previous['pos'] for node in G)
+        return previous if shared * 2 >= G.number_of_nodes() else None
+
+    @staticmethod
+    def _positions(entry, G):
+        """取出缓存中仍存在于当前图里的节点坐标"""
+        return {node: np.array(entry['pos'][str(node)]) for node in G if str(node) in entry['pos']}
+
+    def _store(self, key, params, weights, G, pos):
+        # 布局计算期间其他进程可能写过文件，先合并它们的条目再保存
+        self._reload()
+        self._entries[key] = {
+            'params': params,
+            'weights': weights,
+            'pos': {str(node): [float(v) for v in xy] for node, xy in pos.items()},
+            'adjacency': {str(node): sorted(map(str, G[node])) for node in G},
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._last_key = key
+
+        if self.path:
+            self._save()
+
+    def _save(self):
+        """先写同目录下的临时文件再原子替换，多个进程同时保存时文件不会写坏"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'entries': self._entries, 'last_key': self._last_key}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -3,16 +3,27 @@ import pandas as pd
 import json
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, html, dcc, Input, Output, State
+from dash import Dash, html, dcc, Input, Output, State, DiskcacheManager, no_update
 import dash_bootstrap_components as dbc
 import random
 from datetime import datetime, timedelta
 import networkx as nx
-import time
-from collections import deque
+import uuid
+import threading
+import diskcache
+from collections import defaultdict
+from itertools import chain, count
+from scipy import sparse
+from layout_cache import LayoutCache
+from figure_cache import FigureCache, SharedFigureCache
+from risk_scatter import build_risk_scatter, risk_scatter_mode, nearest_patient
+from treatment_aggregates import TreatmentAggregates
+from realtime_engine import RealTimeEngine
+from vitals_store import VitalsStore, sample_vitals
+from patient_storage import storage_format, write_patients, read_patients
+from cluster_selection import select_n_clusters, best_n_clusters
+from streaming_projection import StreamingProjection, rows_matrix
 
 def generate_patient_data(n_patients=1000):
     """生成更丰富的模拟患者数据"""
@@ -105,41 +116,73 @@ def generate_patient_data(n_patients=1000):
     
     return data
 
-def create_network_graph(df):
-    """创建关联网络图"""
+def _list_indicator(series):
+    """把列表列一次性展开为稀疏的患者×类别指示矩阵，返回(矩阵, 类别名称)"""
+    lists = series.tolist()
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    
+    # defaultdict在首次遇到某个类别时分配下一个连续编码，整个展开过程只遍历一次
+    vocabulary = defaultdict(count().__next__)
+    codes = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(lists)),
+                        dtype=np.int64, count=lengths.sum())
+    
+    # 行号天然有序，直接构造CSR的indptr，无需排序
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    matrix = sparse.csr_matrix((np.ones(len(codes), dtype=np.int32), codes, indptr),
+                               shape=(len(lists), len(vocabulary)))
+    return matrix, list(vocabulary)
+
+def build_cooccurrence_graph(df):
+    """用稀疏矩阵乘积统计症状-治疗、治疗-药物共现次数，并直接由加权邻接关系构建网络"""
+    symptom_matrix, symptom_names = _list_indicator(df['symptoms'])
+    medication_matrix, medication_names = _list_indicator(df['medications'])
+    
+    treatment_codes, treatment_names = pd.factorize(df['treatment'])
+    treatment_matrix = sparse.csr_matrix(
+        (np.ones(len(df), dtype=np.int32), treatment_codes, np.arange(len(df) + 1)),
+        shape=(len(df), len(treatment_names))
+    )
+    
+    # 共现次数矩阵：症状×治疗、治疗×药物
+    symptom_treatment = (symptom_matrix.T @ treatment_matrix).toarray()
+    treatment_medication = (treatment_matrix.T @ medication_matrix).toarray()
+    
     G = nx.Graph()
+    G.add_nodes_from(symptom_names, node_type='symptom')
+    G.add_nodes_from(treatment_names, node_type='treatment')
+    G.add_nodes_from(medication_names, node_type='medication')
     
-    # 添加症状节点
-    all_symptoms = set()
-    for symptoms in df['symptoms']:
-        all_symptoms.update(symptoms)
-    for symptom in all_symptoms:
-        G.add_node(symptom, node_type='symptom')
-    
-    # 添加治疗节点
-    treatments = df['treatment'].unique()
-    for treatment in treatments:
-        G.add_node(treatment, node_type='treatment')
-    
-    # 添加药物节点
-    all_medications = set()
-    for meds in df['medications']:
-        all_medications.update(meds)
-    for med in all_medications:
-        G.add_node(med, node_type='medication')
-    
-    # 创建边连接
-    for _, row in df.iterrows():
-        # 症状与治疗的关联
-        for symptom in row['symptoms']:
-            G.add_edge(symptom, row['treatment'])
-        
-        # 治疗与药物的关联
-        for med in row['medications']:
-            G.add_edge(row['treatment'], med)
+    rows, cols = np.nonzero(symptom_treatment)
+    G.add_weighted_edges_from(
+        (symptom_names[i], treatment_names[j], int(symptom_treatment[i, j])) for i, j in zip(rows, cols)
+    )
+    rows, cols = np.nonzero(treatment_medication)
+    G.add_weighted_edges_from(
+        (treatment_names[i], medication_names[j], int(treatment_medication[i, j])) for i, j in zip(rows, cols)
+    )
+    return G
+
+# 关联网络布局缓存：网络结构不变时直接复用坐标，少量节点变化时从上一次布局热启动
+# 布局在后台进程中计算，持久化到文件；每次查询前检查文件是否被其他进程更新过，各进程和多次启动之间都能复用
+network_layout_cache = LayoutCache(path='.layout_cache/main.json')
+
+# 聚类和聚类分布图使用的特征；聚类分布图最多绘制的患者数
+CLUSTER_FEATURES = ['age', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'cholesterol', 'bmi', 'exercise_hours']
+CLUSTER_MAP_MAX_POINTS = 50000
+
+# 后台回调：耗时的面板在本地进程池中计算，任务状态、进度和结果保存在磁盘缓存中
+background_cache = diskcache.Cache('./.dash_cache')
+# 每次启动使用新的缓存命名空间，避免读到上一次运行的旧图表
+launch_uid = uuid.uuid4().hex
+background_manager = DiskcacheManager(background_cache, cache_by=[lambda: launch_uid], expire=600)
+
+def create_network_graph(df):
+    """创建关联网络图"""
+    G = build_cooccurrence_graph(df)
     
-    # 转换为plotly可用的格式
-    pos = nx.spring_layout(G)
+    # 转换为plotly可用的格式（边权为共现次数，布局仍按无权图计算）
+    pos = network_layout_cache.spring_layout(G, weight=None)
     edge_x = []
     edge_y = []
     for edge in G.edges():
@@ -166,42 +209,14 @@ def create_network_graph(df):
     
     return edge_x, edge_y, node_x, node_y, node_text, node_color
 
-def generate_real_time_data(base_data, window_size=50):
-    """生成实时数据"""
-    while True:
-        # 随机选择一部分数据进行更新
-        sample_size = random.randint(5, 10)
-        sample_indices = random.sample(range(len(base_data)), sample_size)
-        
-        for idx in sample_indices:
-            base_data[idx]['systolic_bp'] = random.randint(90, 180)
-            base_data[idx]['heart_rate'] = random.randint(60, 100)
-            
-            # 更新风险评分
-            risk_score = 0
-            if base_data[idx]['age'] > 60: risk_score += 2
-            if base_data[idx]['systolic_bp'] > 140: risk_score += 2
-            if base_data[idx]['diastolic_bp'] > 90: risk_score += 1
-            if base_data[idx]['heart_rate'] > 90: risk_score += 1
-            if base_data[idx]['cholesterol'] > 200: risk_score += 2
-            if base_data[idx]['smoking'] == '是': risk_score += 2
-            if base_data[idx]['diabetes'] == '是': risk_score += 2
-            if base_data[idx]['bmi'] > 30: risk_score += 1
-            if base_data[idx]['exercise_hours'] < 3: risk_score += 1
-            
-            if risk_score <= 4:
-                base_data[idx]['risk_level'] = '低'
-            elif risk_score <= 8:
-                base_data[idx]['risk_level'] = '中'
-            else:
-                base_data[idx]['risk_level'] = '高'
-        
-        yield pd.DataFrame(base_data)
-        time.sleep(2)  # 每2秒更新一次
+def generate_real_time_data(df, interval=2.0):
+    """生成实时数据：原地更新df中被抽中的行，每interval秒产出一个变化批次"""
+    return iter(RealTimeEngine(df, interval=interval))
 
 def create_dashboard(df):
     """创建更丰富的交互式数据可视化仪表板"""
-    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
+               background_callback_manager=background_manager)
     
     # 初始统计数据
     total_patients = len(df)
@@ -211,14 +226,32 @@ def create_dashboard(df):
     # 创建关联网络图数据
     edge_x, edge_y, node_x, node_y, node_text, node_color = create_network_graph(df)
     
-    # 存储实时数据
-    app.real_time_data = deque(maxlen=50)
+    # 数据版本号：患者数据每次变化时加一；图表缓存在所有会话间共享
+    app.data_version = 0
+    app.figure_cache = FigureCache()
+    app.shared_figures = SharedFigureCache(background_cache, namespace=launch_uid)
+    
+    # 治疗方案×治疗反应×风险等级的人数表，患者变化时增量更新，旭日图和柱状图只读取这张表
+    app.treatment_aggregates = TreatmentAggregates.from_frame(df)
+    
+    # 患者聚类分布的二维投影：启动时按批partial_fit，之后只用变化的患者增量更新
+    app.cluster_projection = StreamingProjection(n_components=2).partial_fit(rows_matrix(df, CLUSTER_FEATURES))
+    app.cluster_map_index = np.sort(np.random.RandomState(42).permutation(len(df))[:CLUSTER_MAP_MAX_POINTS])
+    
+    # 实时数据流：定时原地更新少量患者的生命体征和风险等级
+    app.realtime_engine = RealTimeEngine(df)
+    # Flask按线程并发处理请求：拿到变化批次后对聚合表、投影和数据版本的修改逐个进行
+    app.update_lock = threading.Lock()
+    
+    # 生命体征：每名患者一个环形缓冲区，所有会话共享；按实时数据流的节奏统一采样
+    app.vitals_store = VitalsStore(len(df), window=50)
+    app.vitals_rng = np.random.RandomState()
+    now = datetime.now()
     for i in range(6):
-        app.real_time_data.append({
-            'timestamp': datetime.now() - timedelta(minutes=5-i),
-            'systolic_bp': df.iloc[0]['systolic_bp'],
-            'heart_rate': df.iloc[0]['heart_rate']
-        })
+        app.vitals_store.append(
+            *sample_vitals(df['systolic_bp'].to_numpy(), df['heart_rate'].to_numpy(), app.vitals_rng),
+            now - timedelta(minutes=5-i)
+        )
     
     app.layout = dbc.Container([
         # 顶部标题和统计信息
@@ -284,7 +317,22 @@ def create_dashboard(df):
                             ],
                             value='2000',
                             className="mb-2"
-                        )
+                        ),
+                        # 全局唯一的定时器：每次触发只发起一次服务器请求，结果写入dashboard-store，
+                        # 再由浏览器端回调分发到各个面板
+                        dcc.Interval(
+                            id='dashboard-tick',
+                            interval=2000,
+                            n_intervals=0
+                        ),
+                        dcc.Store(id='dashboard-store'),
+                        dcc.Store(id='dashboard-rendered', data={}),
+                        # 生命体征图最近一次整体重建时对应的患者和采样计数
+                        dcc.Store(id='vitals-rendered'),
+                        # 后台面板的图表标记：变化时触发对应的后台回调
+                        dcc.Store(id='risk-prediction-token'),
+                        dcc.Store(id='network-graph-token'),
+                        dcc.Store(id='cluster-map-token')
                     ])
                 ], className="mb-4 shadow")
             ], width=12)
@@ -296,12 +344,9 @@ def create_dashboard(df):
                 dbc.Card([
                     dbc.CardHeader("实时风险分布"),
                     dbc.CardBody([
+                        html.Progress(id='risk-prediction-progress', style={'display': 'none'}),
                         dcc.Graph(id='risk-prediction'),
-                        dcc.Interval(
-                            id='risk-update-interval',
-                            interval=2000,
-                            n_intervals=0
-                        )
+                        html.Div(id='risk-hover-detail', className="small text-muted")
                     ])
                 ], className="mb-4 shadow")
             ], width=6),
@@ -310,12 +355,7 @@ def create_dashboard(df):
                 dbc.Card([
                     dbc.CardHeader("治疗效果分析"),
                     dbc.CardBody([
-                        dcc.Graph(id='treatment-effect'),
-                        dcc.Interval(
-                            id='treatment-update-interval',
-                            interval=2000,
-                            n_intervals=0
-                        )
+                        dcc.Graph(id='treatment-effect')
                     ])
                 ], className="mb-4 shadow")
             ], width=6)
@@ -329,12 +369,8 @@ def create_dashboard(df):
                 dbc.Card([
                     dbc.CardHeader("症状-治疗-药物关联网络"),
                     dbc.CardBody([
-                        dcc.Graph(id='network-graph'),
-                        dcc.Interval(
-                            id='network-update-interval',
-                            interval=5000,
-                            n_intervals=0
-                        )
+                        html.Progress(id='network-graph-progress', style={'display': 'none'}),
+                        dcc.Graph(id='network-graph')
                     ])
                 ], className="mb-4 shadow")
             ], width=6),
@@ -344,11 +380,6 @@ def create_dashboard(df):
                     dbc.CardHeader("实时生命体征监测"),
                     dbc.CardBody([
                         dcc.Graph(id='vitals-monitor'),
-                        dcc.Interval(
-                            id='vitals-update-interval',
-                            interval=1000,
-                            n_intervals=0
-                        ),
                         html.Div([
                             dcc.Dropdown(
                                 id='patient-selector',
@@ -371,12 +402,20 @@ def create_dashboard(df):
                 dbc.Card([
                     dbc.CardHeader("治疗效果实时评估"),
                     dbc.CardBody([
-                        dcc.Graph(id='treatment-evaluation'),
-                        dcc.Interval(
-                            id='evaluation-update-interval',
-                            interval=3000,
-                            n_intervals=0
-                        )
+                        dcc.Graph(id='treatment-evaluation')
+                    ])
+                ], className="mb-4 shadow")
+            ], width=12)
+        ]),
+        
+        # 第四行：患者聚类分布（增量PCA投影）
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("患者聚类实时分布"),
+                    dbc.CardBody([
+                        html.Progress(id='cluster-map-progress', style={'display': 'none'}),
+                        dcc.Graph(id='cluster-map')
                     ])
                 ], className="mb-4 shadow")
             ], width=12)
@@ -384,94 +423,257 @@ def create_dashboard(df):
         
     ], fluid=True, className="px-4 py-3")
     
-    # 回调函数：更新时间间隔
+    # 各面板的图表构建函数
+    def build_risk_prediction():
+        # 患者较多时自动切换为WebGL散点，更多时切换为服务器端栅格化的密度图
+        return build_risk_scatter(df)
+    
+    def build_treatment_effect():
+        return app.treatment_aggregates.sunburst()
+    
+    def build_network_graph():
+        edge_x, edge_y, node_x, node_y, node_text, node_color = create_network_graph(df)
+        return {
+            'data': [
+                go.Scatter(
+                    x=edge_x,
+                    y=edge_y,
+                    mode='lines',
+                    line=dict(width=0.8, color='#888'),
+                    hoverinfo='none'
+                ),
+                go.Scatter(
+                    x=node_x,
+                    y=node_y,
+                    mode='markers+text',
+                    text=node_text,
+                    textposition='top center',
+                    marker=dict(size=18, color=node_color),
+                    hoverinfo='text'
+                )
+            ],
+            'layout': go.Layout(
+                title='症状-治疗-药物关联网络',
+                showlegend=False,
+                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                hovermode='closest'
+            )
+        }
+    
+    def build_treatment_evaluation():
+        return app.treatment_aggregates.response_bar()
+    
+    def build_cluster_map():
+        # 用当前的增量PCA投影全部患者，患者过多时只绘制固定的一部分
+        display_index = app.cluster_map_index
+        coords = app.cluster_projection.transform(rows_matrix(df, CLUSTER_FEATURES, display_index))
+        color_column = 'cluster' if 'cluster' in df else 'risk_level'
+        groups = df[color_column].to_numpy()[display_index]
+        fig = go.Figure()
+        for group in sorted(set(groups), key=str):
+            mask = groups == group
+            fig.add_trace(go.Scattergl(
+                x=coords[mask, 0],
+                y=coords[mask, 1],
+                mode='markers',
+                name=f'群体{group + 1}' if color_column == 'cluster' else str(group),
+                marker=dict(size=5, opacity=0.6)
+            ))
+        return fig.update_layout(
+            title=f'患者聚类分布（增量PCA，已更新{app.cluster_projection.n_updates}批）',
+            xaxis_title='主成分1',
+            yaxis_title='主成分2'
+        )
+    
+    # 轻量面板在定时回调中直接构建；耗时面板交给后台回调，不占用Dash的请求线程
+    panel_builders = {
+        'treatment-effect': build_treatment_effect,
+        'treatment-evaluation': build_treatment_evaluation
+    }
+    background_panels = {
+        'risk-prediction': build_risk_prediction,
+        'network-graph': build_network_graph,
+        'cluster-map': build_cluster_map
+    }
+    
+    # 回调函数：统一的服务器端定时更新
+    # 基于同一份数据快照一次性算出所有面板的更新；客户端已渲染当前数据版本的图表不再重复下发
     @app.callback(
-        [Output('risk-update-interval', 'interval'),
-         Output('treatment-update-interval', 'interval'),
-         Output('network-update-interval', 'interval'),
-         Output('vitals-update-interval', 'interval'),
-         Output('evaluation-update-interval', 'interval')],
+        [Output('dashboard-store', 'data'),
+         Output('dashboard-rendered', 'data'),
+         *[Output(f'{panel}-token', 'data') for panel in background_panels]],
+        [Input('dashboard-tick', 'n_intervals')],
+        [State('dashboard-rendered', 'data'),
+         State('patient-selector', 'value'),
+         State('vitals-rendered', 'data')]
+    )
+    def update_dashboard(n, rendered, patient_index, vitals_rendered):
+        rendered = dict(rendered or {})
+        
+        # 到了更新时刻才会产出变化批次，同一时刻的多个会话共享同一次更新
+        with app.update_lock:
+            batch = app.realtime_engine.poll()
+            if batch is not None:
+                app.treatment_aggregates.apply_changes(batch.previous, batch.current)
+                app.cluster_projection.partial_fit(rows_matrix(df, CLUSTER_FEATURES, batch.indices))
+                app.data_version += 1
+                app.vitals_store.append(
+                    *sample_vitals(df['systolic_bp'].to_numpy(), df['heart_rate'].to_numpy(), app.vitals_rng),
+                    batch.timestamp
+                )
+        
+        figures = {}
+        for panel, builder in panel_builders.items():
+            token = app.figure_cache.token(panel, app.data_version)
+            if rendered.get(panel) != token:
+                figures[panel] = app.figure_cache.get_or_build(token, builder)
+                rendered[panel] = token
+        
+        # 后台面板只在数据版本变化时更新标记，由后台回调负责构建和下发
+        background_tokens = []
+        for panel in background_panels:
+            # 实时更新不改动症状、治疗和药物，关联网络图不随数据版本重建
+            version = 0 if panel == 'network-graph' else app.data_version
+            token = app.figure_cache.token(panel, version)
+            if rendered.get(panel) != token:
+                background_tokens.append(token)
+                rendered[panel] = token
+            else:
+                background_tokens.append(no_update)
+        
+        counts = app.treatment_aggregates.table()
+        total = int(counts['count'].sum())
+        high_risk = int(counts.loc[counts['risk_level'] == '高', 'count'].sum())
+        
+        # 只下发本会话所选患者在图中已有数据之后的新采样：起点取update_vitals重建整张图时的采样计数
+        # 与之后增量下发到的采样计数中较大的一个；切换患者后整张图还没重建时不下发
+        vitals = None
+        vitals_rendered = vitals_rendered or {}
+        if vitals_rendered.get('patient') == patient_index:
+            since = vitals_rendered['tick']
+            if rendered.get('vitals_patient') == patient_index:
+                since = max(since, rendered.get('vitals_tick', 0))
+            tick, timestamps, systolic_bp, heart_rate = app.vitals_store.snapshot(patient_index, since=since)
+            if len(timestamps):
+                vitals = {
+                    'timestamps': [timestamp.isoformat() for timestamp in timestamps],
+                    'systolic_bp': systolic_bp.tolist(),
+                    'heart_rate': heart_rate.tolist(),
+                    'window': app.vitals_store.window
+                }
+            rendered['vitals_patient'] = patient_index
+            rendered['vitals_tick'] = tick
+        
+        return {
+            'stats': {
+                'total': total,
+                'high_risk': high_risk,
+                'percentage': round((high_risk / total) * 100, 1)
+            },
+            'figures': figures,
+            'vitals': vitals
+        }, rendered, *background_tokens
+    
+    # 浏览器端回调：更新时间间隔（无需请求服务器）
+    app.clientside_callback(
+        """
+        function(intervalValue, autoUpdate) {
+            return [!autoUpdate, parseInt(intervalValue)];
+        }
+        """,
+        [Output('dashboard-tick', 'disabled'),
+         Output('dashboard-tick', 'interval')],
         [Input('update-interval-select', 'value'),
          Input('auto-update-switch', 'value')]
     )
-    def update_interval(interval_value, auto_update):
-        if not auto_update:
-            return [None] * 5
-        return [int(interval_value)] * 5
     
-    # 回调函数：更新统计数据
-    @app.callback(
+    # 浏览器端回调：更新统计数据
+    app.clientside_callback(
+        """
+        function(data) {
+            if (!data) {
+                return window.dash_clientside.no_update;
+            }
+            return [String(data.stats.total), String(data.stats.high_risk), data.stats.percentage + '%'];
+        }
+        """,
         [Output('total-patients', 'children'),
          Output('high-risk-patients', 'children'),
          Output('risk-percentage', 'children')],
-        [Input('risk-update-interval', 'n_intervals')]
+        [Input('dashboard-store', 'data')]
     )
-    def update_stats(n):
-        total = len(df)
-        high_risk = len(df[df['risk_level'] == '高'])
-        percentage = round((high_risk / total) * 100, 1)
-        return f"{total}", f"{high_risk}", f"{percentage}%"
     
-    # 回调函数：更新风险预测图
-    @app.callback(
-        Output('risk-prediction', 'figure'),
-        [Input('risk-update-interval', 'n_intervals')]
-    )
-    def update_risk_prediction(n):
-        return px.scatter(
-            df,
-            x='age',
-            y='systolic_bp',
-            color='risk_level',
-            size='cholesterol',
-            hover_data=['patient_id', 'gender', 'diabetes'],
-            title='实时患者风险分布',
-            labels={'age': '年龄', 'systolic_bp': '收缩压 (mmHg)'},
-            color_discrete_map={'低': 'green', '中': 'yellow', '高': 'red'},
-            animation_frame='risk_level'
-        ).update_layout(transition_duration=500)
-    
-    # 回调函数：更新治疗效果图
+    # 浏览器端回调：把本次下发的图表分发到对应面板，未下发的面板保持不变
+    for panel in panel_builders:
+        app.clientside_callback(
+            """
+            function(data) {
+                if (!data || !data.figures || !data.figures['%s']) {
+                    return window.dash_clientside.no_update;
+                }
+                return data.figures['%s'];
+            }
+            """ % (panel, panel),
+            Output(panel, 'figure'),
+            [Input('dashboard-store', 'data')]
+        )
+    
+    # 后台回调：在本地进程池中构建耗时面板
+    # - 同一标记的结果按launch_uid缓存在磁盘上，其他会话请求同一版本时直接返回
+    # - 多个会话同时请求同一版本时，由共享图表缓存的磁盘锁保证只构建一次
+    # - 构建过程中标记再次变化时，Dash会终止本会话中已过期的任务
+    for panel, builder in background_panels.items():
+        def render_panel(set_progress, token, builder=builder):
+            # 进度条按构建阶段（等待构建锁、构建图表、序列化、写入缓存）推进，悬停时显示当前阶段
+            def report(done, total, label):
+                set_progress((str(done), str(total), label))
+            return app.shared_figures.get_or_build(token, builder, progress=report)
+        
+        app.callback(
+            Output(panel, 'figure'),
+            [Input(f'{panel}-token', 'data')],
+            background=True,
+            running=[(Output(f'{panel}-progress', 'style'), {'width': '100%'}, {'display': 'none'})],
+            progress=[Output(f'{panel}-progress', 'value'), Output(f'{panel}-progress', 'max'),
+                      Output(f'{panel}-progress', 'title')],
+            prevent_initial_call=True
+        )(render_panel)
+    
+    # 回调函数：密度图模式下按需查询光标处最近的患者
     @app.callback(
-        Output('treatment-effect', 'figure'),
-        [Input('treatment-update-interval', 'n_intervals')]
+        Output('risk-hover-detail', 'children'),
+        [Input('risk-prediction', 'hoverData')]
     )
-    def update_treatment_effect(n):
-        return px.sunburst(
-            df,
-            path=['treatment', 'treatment_response', 'risk_level'],
-            title='实时治疗方案效果分析',
-            color='risk_level',
-            color_discrete_map={'低': 'green', '中': 'yellow', '高': 'red'}
-        ).update_layout(transition_duration=500)
-    
-    # 回调函数：更新生命体征监测
+    def update_risk_hover(hover_data):
+        if not hover_data or risk_scatter_mode(len(df)) != 'raster':
+            return ''
+        point = hover_data['points'][0]
+        patient = nearest_patient(df, point['x'], point['y'])
+        return (f"患者 {patient['patient_id']} | 年龄 {patient['age']} | 收缩压 {patient['systolic_bp']} | "
+                f"性别 {patient['gender']} | 糖尿病 {patient['diabetes']} | 风险等级 {patient['risk_level']}")
+    
+    # 回调函数：切换患者时重建生命体征监测图（只在选择变化时触发）
     @app.callback(
-        Output('vitals-monitor', 'figure'),
-        [Input('vitals-update-interval', 'n_intervals'),
-         Input('patient-selector', 'value')]
+        [Output('vitals-monitor', 'figure'),
+         Output('vitals-rendered', 'data')],
+        [Input('patient-selector', 'value')]
     )
-    def update_vitals(n, patient_index):
-        # 添加新的测量值
-        app.real_time_data.append({
-            'timestamp': datetime.now(),
-            'systolic_bp': random.randint(90, 180),
-            'heart_rate': random.randint(60, 100)
-        })
-        
-        df_vitals = pd.DataFrame(app.real_time_data)
+    def update_vitals(patient_index):
+        # 记下整张图包含到第几次采样，增量下发从这里接着开始
+        tick, timestamps, systolic_bp, heart_rate = app.vitals_store.snapshot(patient_index)
         
         return {
             'data': [
                 go.Scatter(
-                    x=df_vitals['timestamp'],
-                    y=df_vitals['systolic_bp'],
+                    x=timestamps,
+                    y=systolic_bp,
                     name='收缩压',
                     line=dict(color='red')
                 ),
                 go.Scatter(
-                    x=df_vitals['timestamp'],
-                    y=df_vitals['heart_rate'],
+                    x=timestamps,
+                    y=heart_rate,
                     name='心率',
                     line=dict(color='blue')
                 )
@@ -483,56 +685,56 @@ def create_dashboard(df):
                 hovermode='x unified',
                 transition_duration=500
             )
-        }
+        }, {'patient': patient_index, 'tick': tick}
     
-    # 回调函数：更新治疗评估
-    @app.callback(
-        Output('treatment-evaluation', 'figure'),
-        [Input('evaluation-update-interval', 'n_intervals')]
+    # 浏览器端回调：增量追加生命体征
+    # 每次只追加新的测量点，并通过extendData裁剪到窗口长度，负载与窗口长度无关
+    app.clientside_callback(
+        """
+        function(data) {
+            if (!data || !data.vitals) {
+                return window.dash_clientside.no_update;
+            }
+            var v = data.vitals;
+            return [
+                {x: [v.timestamps, v.timestamps], y: [v.systolic_bp, v.heart_rate]},
+                [0, 1],
+                v.window
+            ];
+        }
+        """,
+        Output('vitals-monitor', 'extendData'),
+        [Input('dashboard-store', 'data')]
     )
-    def update_treatment_evaluation(n):
-        return px.bar(
-            df.groupby(['treatment', 'treatment_response']).size().reset_index(name='count'),
-            x='treatment',
-            y='count',
-            color='treatment_response',
-            title='实时治疗效果评估',
-            barmode='group',
-            animation_frame='treatment_response'
-        ).update_layout(
-            transition_duration=500,
-            updatemenus=[{
-                'type': 'buttons',
-                'showactive': False,
-                'buttons': [{
-                    'label': '播放',
-                    'method': 'animate',
-                    'args': [None, {'frame': {'duration': 1000, 'redraw': True}, 'fromcurrent': True}]
-                }]
-            }]
-        )
     
     return app
 
-def save_data(data, filename='data.json'):
-    """将数据保存为JSON文件"""
+def save_data(data, filename='data.parquet'):
+    """保存患者数据：.parquet和.arrow为列式存储，.json沿用原来的JSON格式"""
+    if storage_format(filename) != 'json':
+        write_patients(data, filename)
+        return
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=4)
 
-def load_data(filename='data.json'):
-    """从JSON文件加载数据"""
+def load_data(filename='data.parquet', columns=None, filters=None):
+    """加载患者数据：列式文件支持按列、按条件读取并返回DataFrame（字典编码列为Categorical），JSON文件返回字典列表"""
+    if storage_format(filename) != 'json':
+        return read_patients(filename, columns=columns, filters=filters).to_pandas()
     with open(filename, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def perform_clustering(df):
-    """执行K-means聚类分析"""
-    features = ['age', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'cholesterol', 'bmi', 'exercise_hours']
-    X = df[features]
+def perform_clustering(df, n_clusters=3):
+    """执行K-means聚类分析；n_clusters为'auto'时先并行扫描k=2..10，按抽样轮廓系数选择簇数"""
+    X = df[CLUSTER_FEATURES]
     
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
-    kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
+    if n_clusters == 'auto':
+        n_clusters = best_n_clusters(select_n_clusters(X_scaled), 'silhouette')
+    
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
     df['cluster'] = kmeans.fit_predict(X_scaled)
     
     return df
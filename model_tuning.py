@@ -0,0 +1,129 @@
+import math
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble._forest import BaseForest
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+
+def _stratified_order(indices, y, rng):
+    """打乱训练集索引，使任意长度的前缀都保持类别比例（各轮子样本逐轮嵌套扩大）"""
+    indices = rng.permutation(indices)
+    labels = y[indices]
+    rank = np.empty(len(indices))
+    for label in np.unique(labels):
+        mask = labels == label
+        rank[mask] = (np.arange(mask.sum()) + 0.5) / mask.sum()
+    return indices[np.argsort(rank, kind='stable')]
+
+
+def _fit_and_score(estimator, params, tree_param, n_trees, X, y, train_idx, test_idx, scorer, cached):
+    """训练单个候选参数并在验证折上打分
+
+    随机森林会复用上一轮缓存的模型，通过warm_start只补种新增的树。
+    """
+    if cached is not None:
+        model = cached
+        model.set_params(**{tree_param: n_trees}, warm_start=True)
+    else:
+        model = clone(estimator).set_params(**params, **{tree_param: n_trees})
+
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    score = scorer(model, X[test_idx], y[test_idx])
+    return score, fit_time, model if isinstance(model, BaseForest) else None
+
+
+def successive_halving_search(estimator, param_grid, X, y, tree_param='n_estimators',
+                              max_trees=500, min_samples=200, factor=3, cv=3,
+                              scoring='roc_auc', n_jobs=-1, random_state=42):
+    """逐轮淘汰(successive halving)的超参数搜索
+
+    每一轮同时按factor倍增树的数量(tree_param)和训练样本量，只保留得分前1/factor的候选，
+    最后一轮使用max_trees棵树和全部训练数据。各候选与各折在进程池中并行训练，
+    随机森林的中间模型会被缓存并在下一轮继续加树。
+    返回包含best_params、best_score、每轮结果results与耗时-AUC前沿frontier的字典。
+    """
+    X = np.asarray(X)
+    y = np.asarray(y)
+    scorer = check_scoring(estimator, scoring=scoring)
+    rng = np.random.RandomState(random_state)
+
+    folds = []
+    for train_idx, test_idx in StratifiedKFold(cv, shuffle=True, random_state=random_state).split(X, y):
+        folds.append((_stratified_order(train_idx, y, rng), test_idx))
+    n_train = min(len(train_idx) for train_idx, _ in folds)
+
+    candidates = list(ParameterGrid(param_grid))
+    n_rounds = max(1, math.ceil(math.log(len(candidates), factor)) + 1)
+    alive = list(range(len(candidates)))
+    cache = {}
+    elapsed = {}
+    records = []
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for r in range(n_rounds):
+            # 资源从最后一轮的满额按factor倍逐轮倒推
+            shrink = factor ** (n_rounds - 1 - r)
+            n_trees = max(1, int(max_trees / shrink))
+            n_samples = min(n_train, max(min_samples, int(n_train / shrink)))
+
+            tasks = [(c, f) for c in alive for f in range(cv)]
+            outputs = parallel(
+                delayed(_fit_and_score)(
+                    estimator, candidates[c], tree_param, n_trees, X, y,
+                    folds[f][0][:n_samples], folds[f][1], scorer, cache.get((c, f))
+                )
+                for c, f in tasks
+            )
+
+            round_scores = {}
+            for (c, f), (score, fit_time, model) in zip(tasks, outputs):
+                # 复用缓存模型时记录累计训练耗时，使各轮耗时可以直接比较
+                if model is not None:
+                    cache[(c, f)] = model
+                    elapsed[(c, f)] = elapsed.get((c, f), 0.0) + fit_time
+                    fit_time = elapsed[(c, f)]
+                round_scores.setdefault(c, []).append((score, fit_time))
+
+            for c, values in round_scores.items():
+                scores, times = zip(*values)
+                records.append({
+                    'round': r,
+                    'candidate': c,
+                    'params': candidates[c],
+                    'n_trees': n_trees,
+                    'n_samples': n_samples,
+                    'mean_score': np.mean(scores),
+                    'std_score': np.std(scores),
+                    'mean_fit_time': np.mean(times),
+                })
+
+            # 淘汰得分靠后的候选，并释放它们的缓存模型
+            n_keep = max(1, math.ceil(len(alive) / factor)) if r < n_rounds - 1 else len(alive)
+            alive = sorted(alive, key=lambda c: np.mean([s for s, _ in round_scores[c]]), reverse=True)[:n_keep]
+            cache = {key: model for key, model in cache.items() if key[0] in alive}
+            elapsed = {key: t for key, t in elapsed.items() if key[0] in alive}
+
+    results = pd.DataFrame(records)
+    last_round = results[results['round'] == results['round'].max()]
+    best = last_round.loc[last_round['mean_score'].idxmax()]
+
+    return {
+        'best_params': {**best['params'], tree_param: max_trees},
+        'best_score': best['mean_score'],
+        'results': results,
+        'frontier': time_auc_frontier(results),
+    }
+
+
+def time_auc_frontier(results):
+    """提取耗时-得分的帕累托前沿：不存在耗时更短且得分更高的其他结果"""
+    ordered = results.sort_values(['mean_fit_time', 'mean_score'], ascending=[True, False])
+    frontier = ordered[ordered['mean_score'] > ordered['mean_score'].cummax().shift(fill_value=-np.inf)]
+    return frontier[['round', 'candidate', 'n_trees', 'n_samples', 'mean_fit_time', 'mean_score', 'params']]
@@ -7,6 +7,7 @@ from matplotlib.colors import LinearSegmentedColormap
 from matplotlib.patches import Patch
 import json
 import os
+from layout_cache import LayoutCache
 
 # 设置高分辨率图像输出
 plt.rcParams['figure.dpi'] = 600
@@ -117,8 +118,10 @@ node_sizes = [max(100, G.degree(node) * 100) for node in G.nodes()]
 edge_weights = [G[u][v]['weight'] for u, v in G.edges()]
 
 # 创建布局 - 使用spring_layout增加可读性
+# 布局按网络结构缓存到磁盘，边权随机变化时从上一次的坐标热启动，无需从头迭代
 np.random.seed(42)  # 确保结果可复现
-pos = nx.spring_layout(G, k=0.3, iterations=50)
+layout_cache = LayoutCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.layout_cache', 'network_visualization.json'))
+pos = layout_cache.spring_layout(G, k=0.3, iterations=50)
 
 # 调整位置，使类型相似的节点相对聚集
 pos_adjusted = pos.copy()
@@ -3,12 +3,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.manifold import TSNE
 from sklearn.cluster import KMeans
 from sklearn.metrics import silhouette_score
 import matplotlib.gridspec as gridspec
 import os
+from chunked_training import parquet_sample, iter_parquet_chunks, fit_scaler_chunked, fit_kmeans_chunked
+from embedding import embed_patients
+from cluster_selection import select_n_clusters, best_n_clusters
+from streaming_projection import StreamingProjection
 
 # 设置随机种子以确保结果可重现
 np.random.seed(42)
@@ -127,29 +129,55 @@ def generate_patient_data(n_samples=1000):
     
     return df
 
-# 生成数据
-df = generate_patient_data(1000)
-
 # 提取用于聚类的特征
 features = ['年龄', '收缩压', '舒张压', '总胆固醇', 'HDL胆固醇', '血糖', 'BMI指数', '心率', '吸烟', '糖尿病']
-X = df[features].values
-
-# 标准化数据
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# 降维用于可视化
-pca = PCA(n_components=2)
-X_pca = pca.fit_transform(X_scaled)
+n_clusters = 3
 
-# t-SNE降维
-tsne = TSNE(n_components=2, perplexity=30, random_state=42)
-X_tsne = tsne.fit_transform(X_scaled)
+# 超出内存的大队列：设置环境变量CARDIOVIZ_PARQUET指向Parquet文件后，标准化和聚类都逐个行组partial_fit，
+# 降维和绘图只使用一个抽样子集
+chunked_path = os.environ.get('CARDIOVIZ_PARQUET')
+
+if chunked_path:
+    scaler = fit_scaler_chunked(chunked_path, features)
+    df = parquet_sample(chunked_path, 5000)
+    X = df[features].values
+    X_scaled = scaler.transform(X)
+else:
+    # 生成数据
+    df = generate_patient_data(1000)
+    X = df[features].values
+
+    # 标准化数据
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+# 降维用于可视化：增量PCA，大队列逐个行组partial_fit，不需要把全部样本放进内存
+projection = StreamingProjection(n_components=2)
+if chunked_path:
+    for chunk in iter_parquet_chunks(chunked_path, features):
+        projection.partial_fit(chunk[features].values)
+else:
+    projection.partial_fit(X)
+X_pca = projection.transform(X)
+
+# t-SNE降维：先PCA，再对至多5000个抽样患者做Barnes-Hut t-SNE，其余患者按最近邻插值；结果按数据哈希缓存
+X_tsne = embed_patients(X_scaled, perplexity=30, max_tsne_samples=5000, random_state=42)
+
+# 设置环境变量CARDIOVIZ_SELECT_K=1时，并行扫描k=2..10，按抽样轮廓系数选择簇数
+if os.environ.get('CARDIOVIZ_SELECT_K') == '1':
+    k_curve = select_n_clusters(X_scaled, k_values=range(2, 11))
+    print("簇数选择曲线:")
+    print(k_curve.round(4).to_string(index=False))
+    n_clusters = best_n_clusters(k_curve, 'silhouette')
+    print(f"选择的簇数: {n_clusters}")
 
 # K-means聚类
-n_clusters = 3
-kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-cluster_labels = kmeans.fit_predict(X_scaled)
+if chunked_path:
+    kmeans = fit_kmeans_chunked(chunked_path, features, scaler, n_clusters=n_clusters, random_state=42)
+    cluster_labels = kmeans.predict(X_scaled)
+else:
+    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+    cluster_labels = kmeans.fit_predict(X_scaled)
 
 # 将聚类结果添加到DataFrame
 df['聚类结果'] = cluster_labels
@@ -256,11 +284,12 @@ for bar in bars:
     ax4.text(bar.get_x() + bar.get_width()/2., height + 0.005,
              f'{height:.2%}', ha='center', va='bottom', fontsize=10)
 
-# 计算高风险组相对于低风险组的风险倍数
-risk_fold = event_stats.loc['高风险复杂型', 'mean'] / event_stats.loc['低风险稳定型', 'mean']
-ax4.text(0.5, 0.85, f'高/低风险比 = {risk_fold:.1f}倍', 
-         ha='center', va='center', transform=ax4.transAxes, 
-         bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8), fontsize=12)
+# 计算高风险组相对于低风险组的风险倍数（自动选择簇数时两个群体不一定都存在）
+if {'高风险复杂型', '低风险稳定型'} <= set(event_stats.index):
+    risk_fold = event_stats.loc['高风险复杂型', 'mean'] / event_stats.loc['低风险稳定型', 'mean']
+    ax4.text(0.5, 0.85, f'高/低风险比 = {risk_fold:.1f}倍', 
+             ha='center', va='center', transform=ax4.transAxes, 
+             bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8), fontsize=12)
 
 # 设置属性
 ax4.set_ylabel('5年心血管事件发生率', fontsize=12)
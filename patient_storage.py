@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# 患者记录的列式存储格式：取值较少的文本列做字典编码，症状、药物和历史测量保存为列表列
+_CATEGORY = pa.dictionary(pa.int16(), pa.string())
+PATIENT_SCHEMA = pa.schema([
+    ('patient_id', pa.string()),
+    ('age', pa.int16()),
+    ('gender', _CATEGORY),
+    ('systolic_bp', pa.int16()),
+    ('diastolic_bp', pa.int16()),
+    ('heart_rate', pa.int16()),
+    ('cholesterol', pa.int16()),
+    ('smoking', _CATEGORY),
+    ('diabetes', _CATEGORY),
+    ('bmi', pa.float32()),
+    ('exercise_hours', pa.int16()),
+    ('visit_date', _CATEGORY),
+    ('symptoms', pa.list_(_CATEGORY)),
+    ('treatment', _CATEGORY),
+    ('medications', pa.list_(_CATEGORY)),
+    ('treatment_response', _CATEGORY),
+    ('follow_up_visits', pa.int16()),
+    ('bp_history', pa.list_(pa.int16())),
+    ('hr_history', pa.list_(pa.int16())),
+    ('risk_level', _CATEGORY),
+])
+
+# 按扩展名区分存储格式
+FORMATS = {'.parquet': 'parquet', '.arrow': 'ipc', '.feather': 'ipc'}
+
+
+def storage_format(filename):
+    """根据扩展名返回'parquet'、'ipc'，JSON文件返回'json'"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.json':
+        return 'json'
+    if extension not in FORMATS:
+        raise ValueError(f"不支持的文件格式: {extension}，可选: .json、{'、'.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def to_patient_table(data):
+    """把患者记录（字典列表或DataFrame）转换为Arrow表，已知列按PATIENT_SCHEMA编码，其余列自动推断类型"""
+    frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+    known = {field.name: field.type for field in PATIENT_SCHEMA}
+    arrays, fields = [], []
+    for column in frame.columns:
+        values = frame[column]
+        if column in known:
+            array = pa.array(values, type=known[column], from_pandas=True)
+        else:
+            array = pa.array(values, from_pandas=True)
+        arrays.append(array)
+        fields.append(pa.field(column, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def write_patients(data, filename, row_group_size=100000):
+    """写为Parquet（压缩、支持按行组跳过）或Arrow IPC文件（不压缩、可内存映射零拷贝读取）"""
+    table = to_patient_table(data)
+    if storage_format(filename) == 'parquet':
+        pq.write_table(table, filename, row_group_size=row_group_size, compression='zstd')
+    else:
+        with pa.OSFile(filename, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=row_group_size)
+
+
+def read_patients(filename, columns=None, filters=None, memory_map=True):
+    """按列投影、按条件过滤读取患者表，返回Arrow表
+
+    filters与pyarrow.parquet相同，如[('risk_level', '==', '高'), ('age', '>', 60)]；
+    Parquet文件会利用行组统计信息跳过不满足条件的行组。
+    Arrow IPC文件通过内存映射打开，只有被读取的列才会分页进入内存。
+    """
+    fmt = storage_format(filename)
+    expression = pq.filters_to_expression(filters) if filters else None
+    if fmt == 'ipc' and memory_map:
+        source = pa.ipc.open_file(pa.memory_map(filename, 'r'))
+        dataset = ds.InMemoryDataset(source.read_all())
+    else:
+        dataset = ds.dataset(filename, format=fmt)
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def convert_json(json_path, out_path=None):
+    """把已有的data.json一次性转换为列式文件，默认在同目录下生成同名的.parquet文件"""
+    out_path = out_path or os.path.splitext(json_path)[0] + '.parquet'
+    with open(json_path, 'r', encoding='utf-8') as f:
+        write_patients(json.load(f), out_path)
+    return out_path
+
+
+if __name__ == '__main__':
+    # 用法: python patient_storage.py data.json [data.parquet]
+    print(convert_json(*sys.argv[1:3]))
@@ -0,0 +1,100 @@
+import numpy as np
+from joblib import Parallel, delayed
+from scipy import stats
+from sklearn.metrics import check_scoring
+from sklearn.utils import Bunch, check_random_state
+
+
+def _permuted_scores(estimator, scorer, X, y, columns, seeds, max_samples):
+    """对同一组特征进行多次联合置换，返回每次置换后的模型得分"""
+    subsample = max_samples is not None and max_samples < len(X)
+    if not subsample:
+        full_baseline = scorer(estimator, X, y)
+
+    scores = []
+    for seed in seeds:
+        rng = np.random.RandomState(seed)
+        # 只对一部分样本打分，避免每次置换都重新预测整个测试集
+        if subsample:
+            rows = rng.choice(len(X), max_samples, replace=False)
+            X_eval, y_eval = X.iloc[rows].reset_index(drop=True), y.iloc[rows].reset_index(drop=True)
+            baseline = scorer(estimator, X_eval, y_eval)
+        else:
+            X_eval, y_eval = X.copy(), y
+            baseline = full_baseline
+
+        # 组内所有列使用同一个行置换，保留组内特征之间的相关结构
+        order = rng.permutation(len(X_eval))
+        X_eval.iloc[:, columns] = X_eval.iloc[order, columns].values
+        scores.append(baseline - scorer(estimator, X_eval, y_eval))
+    return scores
+
+
+def _ci_halfwidth(values, confidence):
+    """重要性均值置信区间的半宽"""
+    n = len(values)
+    if n < 2:
+        return np.inf
+    t = stats.t.ppf(0.5 + confidence / 2, df=n - 1)
+    return t * np.std(values, ddof=1) / np.sqrt(n)
+
+
+def parallel_permutation_importance(estimator, X, y, feature_groups=None, scoring=None,
+                                    n_repeats=30, min_repeats=5, batch_repeats=5,
+                                    ci_tol=0.005, confidence=0.95, max_samples=None,
+                                    n_jobs=-1, random_state=None):
+    """并行计算置换特征重要性，置信区间足够窄时提前停止重复
+
+    feature_groups为{名称: [列名, ...]}，同一组内的特征会被一起置换（例如所有胆固醇指标）；
+    为None时每个特征单独成组。返回结果的字段与sklearn.inspection.permutation_importance保持一致，
+    另外附带每组实际使用的重复次数和置信区间半宽。
+    """
+    X = X.reset_index(drop=True)
+    y = y.reset_index(drop=True)
+    if feature_groups is None:
+        feature_groups = {name: [name] for name in X.columns}
+
+    names = list(feature_groups)
+    columns = [[X.columns.get_loc(c) for c in feature_groups[name]] for name in names]
+    scorer = check_scoring(estimator, scoring=scoring)
+
+    # 预先为每组抽取全部种子，保证结果与提前停止的时机无关
+    rng = check_random_state(random_state)
+    seeds = rng.randint(np.iinfo(np.int32).max, size=(len(names), n_repeats))
+
+    results = [[] for _ in names]
+    active = list(range(len(names)))
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while active:
+            # 首轮每组先做min_repeats次，之后每轮只为尚未收敛的组追加batch_repeats次
+            tasks = []
+            for g in active:
+                done = len(results[g])
+                step = min_repeats if done == 0 else batch_repeats
+                tasks.append((g, seeds[g, done:min(done + step, n_repeats)]))
+
+            batch_scores = parallel(
+                delayed(_permuted_scores)(estimator, scorer, X, y, columns[g], group_seeds, max_samples)
+                for g, group_seeds in tasks
+            )
+            for (g, _), scores in zip(tasks, batch_scores):
+                results[g].extend(scores)
+
+            active = [
+                g for g in active
+                if len(results[g]) < n_repeats and _ci_halfwidth(results[g], confidence) > ci_tol
+            ]
+
+    used = np.array([len(r) for r in results])
+    importances = np.full((len(names), used.max()), np.nan)
+    for g, r in enumerate(results):
+        importances[g, :len(r)] = r
+
+    return Bunch(
+        names=names,
+        importances_mean=np.nanmean(importances, axis=1),
+        importances_std=np.nanstd(importances, axis=1),
+        importances=importances,
+        n_repeats=used,
+        ci_halfwidth=np.array([_ci_halfwidth(r, confidence) for r in results]),
+    )
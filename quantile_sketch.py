@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class TDigest:
+    """合并式t-digest分位数草图：用有限个质心近似一维分布，可增量更新、可跨进程合并
+
+    质心大小受k1尺度函数约束，两端的质心很小、中部的质心较大，因此尾部分位数更精确；
+    质心数量约为compression量级，与样本数无关。
+    """
+
+    def __init__(self, compression=200, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or 10 * compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    def update(self, values):
+        """加入一批数值（忽略NaN）"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= self.buffer_size:
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """合并另一个草图（例如另一个工作进程的结果）"""
+        other._compress()
+        self._compress()
+        # 质心均值会把两端的极值平均掉，精确的最小值和最大值要单独合并
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(other.means, other.weights)
+        return self
+
+    def _compress(self, extra_means=None, extra_weights=None):
+        """把缓冲区和额外的质心并入现有质心，按k1尺度函数重新分组"""
+        means = [self.means] + self._buffer
+        weights = [self.weights] + [np.ones(len(values)) for values in self._buffer]
+        if extra_means is not None:
+            means.append(extra_means)
+            weights.append(extra_weights)
+        self._buffer, self._buffered = [], 0
+
+        means = np.concatenate(means)
+        weights = np.concatenate(weights)
+        if not len(means):
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        total = weights.sum()
+        self.count = total
+        self.min = min(self.min, means[0])
+        self.max = max(self.max, means[-1])
+
+        # 每个点按其中心位置的分位数映射到k1刻度上，同一整数刻度内的点合并为一个质心
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def _positions(self):
+        """合并均值相同的质心后，返回(质心均值, 质心中心处的累计权重)"""
+        self._compress()
+        means, index = np.unique(self.means, return_inverse=True)
+        weights = np.bincount(index, weights=self.weights)
+        return means, np.cumsum(weights) - weights / 2
+
+    def quantile(self, q):
+        """近似分位数，q可以是标量或数组"""
+        means, positions = self._positions()
+        xp = np.r_[0.0, positions, self.count]
+        fp = np.r_[self.min, means, self.max]
+        return np.interp(np.asarray(q) * self.count, xp, fp)
+
+    def cdf(self, x):
+        """近似累积分布（取值相同的样本得到相同的中位秩），x可以是标量或数组"""
+        means, positions = self._positions()
+        if not len(means):
+            return np.full(np.shape(x), np.nan)
+        return np.interp(x, means, positions) / self.count
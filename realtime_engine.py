@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+RISK_LABELS = np.array(['低', '中', '高'], dtype=object)
+
+# 实时更新会改动的列，以及风险评分中只依赖这些列的部分
+VITAL_COLUMNS = ['systolic_bp', 'heart_rate']
+BATCH_COLUMNS = ['patient_id', 'systolic_bp', 'heart_rate', 'risk_level', 'treatment', 'treatment_response']
+
+# 一次实时更新：被改动的行号，以及这些行改动前后的快照（列为BATCH_COLUMNS）
+ChangeBatch = namedtuple('ChangeBatch', ['timestamp', 'indices', 'previous', 'current'])
+
+
+def static_risk_scores(df):
+    """风险评分中不随实时更新变化的部分，对整张表向量化计算一次"""
+    score = np.zeros(len(df), dtype=np.int16)
+    score += 2 * (df['age'].to_numpy() > 60)
+    score += 1 * (df['diastolic_bp'].to_numpy() > 90)
+    score += 2 * (df['cholesterol'].to_numpy() > 200)
+    score += 2 * (df['smoking'].to_numpy() == '是')
+    score += 2 * (df['diabetes'].to_numpy() == '是')
+    score += 1 * (df['bmi'].to_numpy() > 30)
+    score += 1 * (df['exercise_hours'].to_numpy() < 3)
+    if 'symptoms' in df:
+        score += 2 * (df['symptoms'].map(len).to_numpy() > 2)
+    return score
+
+
+def vital_risk_scores(systolic_bp, heart_rate):
+    """风险评分中随生命体征变化的部分"""
+    return 2 * (np.asarray(systolic_bp) > 140) + 1 * (np.asarray(heart_rate) > 90)
+
+
+def risk_levels(scores):
+    """评分转风险等级：≤4为低，≤8为中，其余为高"""
+    return RISK_LABELS[np.digitize(scores, [5, 9])]
+
+
+class RealTimeEngine:
+    """实时数据流：原地修改患者表中被选中的行，只为这些行重新计算风险等级
+
+    每次更新返回一个ChangeBatch，而不是重新生成整张DataFrame；
+    更新节奏由interval控制，poll()不阻塞，迭代时等到下一个更新时刻再产出。
+    """
+
+    def __init__(self, df, interval=2.0, batch_size=(5, 10), random_state=None):
+        self.df = df
+        self.interval = interval
+        self.batch_size = batch_size
+        self._rng = np.random.RandomState(random_state)
+        self._static_scores = static_risk_scores(df)
+        self._vital_positions = [df.columns.get_loc(column) for column in VITAL_COLUMNS]
+        self._risk_position = df.columns.get_loc('risk_level')
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._next_update = time.monotonic() + interval
+
+    def step(self):
+        """立即执行一次更新并返回ChangeBatch"""
+        with self._lock:
+            n_rows = len(self.df)
+            # 有放回抽样再去重，避免choice(replace=False)对全部行做一次排列；重复时本批略少几行
+            indices = np.unique(self._rng.randint(0, n_rows, self._rng.randint(self.batch_size[0], self.batch_size[1] + 1)))
+            size = len(indices)
+
+            previous = self._snapshot(indices)
+
+            # 按列原来的类型生成（列式文件加载的数值列为int16）
+            systolic_bp = self._rng.randint(90, 181, size).astype(self.df.dtypes.iloc[self._vital_positions[0]])
+            heart_rate = self._rng.randint(60, 101, size).astype(self.df.dtypes.iloc[self._vital_positions[1]])
+            levels = risk_levels(self._static_scores[indices] + vital_risk_scores(systolic_bp, heart_rate))
+
+            # 按列向量化写回被选中的行
+            self.df.iloc[indices, self._vital_positions[0]] = systolic_bp
+            self.df.iloc[indices, self._vital_positions[1]] = heart_rate
+            self.df.iloc[indices, self._risk_position] = levels
+
+            current = self._snapshot(indices)
+            self._next_update = time.monotonic() + self.interval
+        return ChangeBatch(datetime.now(), indices, previous, current)
+
+    def _snapshot(self, indices):
+        """逐列取出被改动行的副本；先按行再按列取会对整张表的每个数据块做一次take"""
+        return pd.DataFrame({column: self.df[column].iloc[indices].to_numpy() for column in BATCH_COLUMNS},
+                            index=self.df.index[indices])
+
+    def poll(self):
+        """到了更新时刻就执行一次更新并返回ChangeBatch，否则返回None（不阻塞）
+
+        时刻检查和更新在同一把锁内完成，多个线程同时poll时每个时刻只有一个线程拿到批次。
+        """
+        with self._lock:
+            if time.monotonic() < self._next_update:
+                return None
+            return self.step()
+
+    def stop(self):
+        """结束迭代"""
+        self._stopped.set()
+
+    def __iter__(self):
+        """按interval持续产出ChangeBatch，直到调用stop()"""
+        while not self._stopped.wait(max(0.0, self._next_update - time.monotonic())):
+            yield self.step()
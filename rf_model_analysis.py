@@ -2,11 +2,14 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_curve, auc, precision_recall_curve, average_precision_score
-from sklearn.inspection import permutation_importance
 import shap
+from permutation_engine import parallel_permutation_importance
+from shap_pipeline import explain_to_memmap, kmeans_background
+from model_tuning import successive_halving_search
+from chunked_training import read_holdout, parquet_sample, fit_forest_chunked
+from risk_models import RISK_MODELS, make_risk_model, search_estimator, model_feature_importance, benchmark_models
 import os
 from matplotlib.colors import LinearSegmentedColormap
 import matplotlib.gridspec as gridspec
@@ -129,34 +132,69 @@ def generate_patient_data(n_samples=1000):
     
     return df
 
-# 生成数据
-df = generate_patient_data(1500)
-
 # 划分特征和目标变量
 features = [
     '年龄', '收缩压', '舒张压', '总胆固醇', 'HDL胆固醇', 'LDL胆固醇', 
     '空腹血糖', 'HbA1c', 'BMI指数', '吸烟', '家族史', '糖尿病', '心率', '既往心血管事件'
 ]
-X = df[features]
-y = df['心血管事件']
-
-# 划分训练集和测试集
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
-
-# 训练随机森林模型
-rf = RandomForestClassifier(
-    n_estimators=500, 
-    max_depth=15,
-    min_samples_leaf=5,
-    max_features='sqrt',
-    random_state=42,
-    n_jobs=-1
-)
-rf.fit(X_train, y_train)
+target = '心血管事件'
+
+# 超出内存的大队列：设置环境变量CARDIOVIZ_PARQUET指向Parquet文件后，按行组分块训练，
+# 最后一个行组作为测试集，X_train只保留一个抽样子集用于重要性分析和参数搜索；
+# 只有随机森林逐个行组增量训练，其他模型在这个抽样子集上训练
+chunked_path = os.environ.get('CARDIOVIZ_PARQUET')
+
+if chunked_path:
+    train_sample = parquet_sample(chunked_path, 20000, columns=features + [target], skip_last=1)
+    test_df = read_holdout(chunked_path, columns=features + [target])
+    X_train, y_train = train_sample[features], train_sample[target]
+    X_test, y_test = test_df[features], test_df[target]
+else:
+    # 生成数据
+    df = generate_patient_data(1500)
+    X = df[features]
+    y = df[target]
+
+    # 划分训练集和测试集
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
+
+# 风险预测模型后端：'rf'为随机森林，'hgb'为直方图梯度提升（通过环境变量CARDIOVIZ_MODEL切换）
+model_name = os.environ.get('CARDIOVIZ_MODEL', 'rf')
+model_label = RISK_MODELS[model_name]['label']
+model_params = {}
+
+# 设置环境变量CARDIOVIZ_TUNE=1时，对所有模型做逐轮淘汰搜索，并用最优参数训练当前模型
+if os.environ.get('CARDIOVIZ_TUNE') == '1':
+    for name, spec in RISK_MODELS.items():
+        search = successive_halving_search(
+            search_estimator(name),
+            spec['search_space'],
+            X_train, y_train,
+            tree_param=spec['tree_param'],
+            max_trees=spec['max_trees']
+        )
+        print(f"{spec['label']}最优参数: {search['best_params']} (CV AUC = {search['best_score']:.3f})")
+        print(f"{spec['label']}训练耗时-AUC前沿:")
+        print(search['frontier'].drop(columns='params').round(4).to_string(index=False))
+
+        if name == model_name:
+            model_params = search['best_params']
+
+# 训练风险预测模型
+model = make_risk_model(model_name, **model_params)
+if chunked_path and model_name == 'rf':
+    # 每个行组补种20棵树，整个训练过程中内存里只有一个行组
+    model = fit_forest_chunked(model, chunked_path, features, target, trees_per_chunk=20)
+else:
+    if chunked_path:
+        # 直方图梯度提升的warm_start每次fit都会按新数据重新分箱，已有的树与新分箱对不上，
+        # 不能逐个行组续训；分块模式下只在抽样子集上训练
+        print(f'{model_label}不支持逐个行组增量训练，改为在 {len(X_train):,} 行的抽样子集上训练')
+    model.fit(X_train, y_train)
 
 # 获取预测概率
-y_proba_train = rf.predict_proba(X_train)[:, 1]
-y_proba_test = rf.predict_proba(X_test)[:, 1]
+y_proba_train = model.predict_proba(X_train)[:, 1]
+y_proba_test = model.predict_proba(X_test)[:, 1]
 
 # 计算ROC曲线
 fpr, tpr, _ = roc_curve(y_test, y_proba_test)
@@ -167,19 +205,29 @@ precision, recall, _ = precision_recall_curve(y_test, y_proba_test)
 average_precision = average_precision_score(y_test, y_proba_test)
 
 # 获取特征重要性
-feature_importance = rf.feature_importances_
+feature_importance, importance_label = model_feature_importance(model, X_train, y_train)
 sorted_idx = np.argsort(feature_importance)
 
-# 计算置换特征重要性
-perm_importance = permutation_importance(rf, X_test, y_test, n_repeats=10, random_state=42)
+# 计算置换特征重要性（多进程并行，置信区间收敛后提前停止；胆固醇指标额外作为一组整体置换）
+# 每次置换只对测试集的一个随机子集打分（最多2000行、最多一半），不重新预测整个测试集
+perm_groups = {feature: [feature] for feature in features}
+perm_groups['胆固醇(合并)'] = ['总胆固醇', 'HDL胆固醇', 'LDL胆固醇']
+perm_importance = parallel_permutation_importance(
+    model, X_test, y_test,
+    feature_groups=perm_groups,
+    n_repeats=30,
+    ci_tol=0.005,
+    max_samples=min(2000, len(X_test) // 2),
+    random_state=42
+)
 perm_sorted_idx = np.argsort(perm_importance.importances_mean)
 
 # 创建可视化图表
 plt.figure(figsize=(16, 14))
 gs = gridspec.GridSpec(2, 2, width_ratios=[1, 1], height_ratios=[1, 1])
 
-# 使用随机森林的特征重要性代替SHAP值
-# 子图1：特征重要性（基于随机森林的特征重要性）
+# 使用模型的特征重要性代替SHAP值
+# 子图1：特征重要性（基于模型自身的特征重要性）
 ax1 = plt.subplot(gs[0, 0])
 importance_df = pd.DataFrame({'特征': features, '重要性': feature_importance})
 importance_df = importance_df.sort_values('重要性', ascending=False)
@@ -191,8 +239,8 @@ sns.barplot(
     palette='viridis',
     ax=ax1
 )
-ax1.set_title('随机森林特征重要性', fontsize=14)
-ax1.set_xlabel('特征重要性', fontsize=12)
+ax1.set_title(f'{model_label}特征重要性', fontsize=14)
+ax1.set_xlabel(importance_label, fontsize=12)
 ax1.set_ylabel('')
 ax1.tick_params(axis='y', labelsize=11)
 
@@ -203,7 +251,7 @@ for i, v in enumerate(importance_df['重要性']):
 # 子图2：特征重要性（基于排列特征重要性）
 ax2 = plt.subplot(gs[0, 1])
 perm_importance_df = pd.DataFrame({
-    '特征': features,
+    '特征': perm_importance.names,
     '重要性': perm_importance.importances_mean
 })
 perm_importance_df = perm_importance_df.sort_values('重要性', ascending=False)
@@ -303,13 +351,45 @@ ax4.set_xlabel('风险级别', fontsize=12)
 ax4.set_ylabel('主要风险特征', fontsize=12)
 
 # 设置整体标题
-plt.suptitle('图4-4 随机森林模型特征重要性与性能分析', fontsize=16, y=0.99)
+plt.suptitle(f'图4-4 {model_label}模型特征重要性与性能分析', fontsize=16, y=0.99)
 plt.tight_layout(rect=[0, 0, 1, 0.97])
 
 # 保存图像
 output_dir = r"D:\Thesis_Revision\ZY0347 本科 基于人类心血管疾病的数据挖掘及可视化 800\ZY0347 本科 数据科学与人工智能\版本一\配图"
-plt.savefig(os.path.join(output_dir, 'rf_model_analysis.png'), bbox_inches='tight', dpi=600)
-print(f"随机森林模型分析图已保存到: {output_dir}")
+plt.savefig(os.path.join(output_dir, f'{model_name}_model_analysis.png'), bbox_inches='tight', dpi=600)
+print(f"{model_label}模型分析图已保存到: {output_dir}")
+
+# 计算测试集SHAP值（K-means概括背景集，分块多进程解释，结果写入磁盘内存映射矩阵）
+shap_values, shap_expected = explain_to_memmap(
+    model, X_test,
+    os.path.join(output_dir, f'{model_name}_shap_values.npy'),
+    background=kmeans_background(X_train, n_clusters=100),
+    chunk_size=2000
+)
+shap_importance = pd.Series(np.abs(shap_values).mean(axis=0), index=features).sort_values(ascending=False)
+print(f"SHAP基准值: {shap_expected:.3f}")
+print("平均|SHAP|排名前5的特征:")
+print(shap_importance.head(5).round(4).to_string())
+
+# 各模型训练耗时与推理延迟对比
+speed_df = benchmark_models(list(RISK_MODELS), X_train, y_train, X_test, y_test)
+print(speed_df.round(4).to_string(index=False))
+
+fig, axes = plt.subplots(1, 3, figsize=(16, 5))
+for ax, column, color in zip(axes,
+                             ['训练耗时(秒)', '批量推理(毫秒/千条)', '单条推理延迟(毫秒)'],
+                             ['#2196F3', '#FF9800', '#4CAF50']):
+    bars = ax.bar(speed_df['模型'], speed_df[column], color=color, alpha=0.8)
+    for bar, value in zip(bars, speed_df[column]):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), f'{value:.3f}',
+                ha='center', va='bottom', fontsize=10)
+    ax.set_title(column, fontsize=13)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+plt.suptitle('风险预测模型训练与推理耗时对比', fontsize=15)
+plt.tight_layout(rect=[0, 0, 1, 0.94])
+plt.savefig(os.path.join(output_dir, 'model_speed_comparison.png'), bbox_inches='tight', dpi=600)
+print(f"模型耗时对比图已保存到: {output_dir}")
 
 # 显示图表
 plt.show() 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import base64
+import struct
+import zlib
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+# 渲染模式阈值：不超过SVG_MAX_POINTS用SVG散点（保留动画），
+# 不超过WEBGL_MAX_POINTS用WebGL散点，更多时在服务器端把密度栅格化为图片
+SVG_MAX_POINTS = 5000
+WEBGL_MAX_POINTS = 200000
+
+RISK_COLORS = {'低': 'green', '中': 'yellow', '高': 'red'}
+RISK_RGB = {'低': (0, 128, 0), '中': (255, 255, 0), '高': (255, 0, 0)}
+
+TITLE = '实时患者风险分布'
+LABELS = {'age': '年龄', 'systolic_bp': '收缩压 (mmHg)'}
+
+
+def risk_scatter_mode(n_points):
+    """根据患者数量选择渲染模式：'svg'、'webgl'或'raster'"""
+    if n_points <= SVG_MAX_POINTS:
+        return 'svg'
+    if n_points <= WEBGL_MAX_POINTS:
+        return 'webgl'
+    return 'raster'
+
+
+def build_risk_scatter(df):
+    """按患者数量自动选择渲染方式的风险分布图"""
+    mode = risk_scatter_mode(len(df))
+    if mode == 'svg':
+        return px.scatter(
+            df,
+            x='age',
+            y='systolic_bp',
+            color='risk_level',
+            size='cholesterol',
+            hover_data=['patient_id', 'gender', 'diabetes'],
+            title=TITLE,
+            labels=LABELS,
+            color_discrete_map=RISK_COLORS,
+            animation_frame='risk_level'
+        ).update_layout(transition_duration=500)
+    if mode == 'webgl':
+        return _build_webgl_scatter(df)
+    return _build_density_image(df)
+
+
+def _build_webgl_scatter(df):
+    """WebGL散点：每个风险等级一条Scattergl轨迹，不再为每个动画帧重复输出全部点"""
+    fig = go.Figure()
+    cholesterol = df['cholesterol'].to_numpy()
+    sizes = 3 + 9 * (cholesterol - cholesterol.min()) / max(np.ptp(cholesterol), 1)
+    for level, color in RISK_COLORS.items():
+        mask = (df['risk_level'] == level).to_numpy()
+        subset = df.loc[mask]
+        fig.add_trace(go.Scattergl(
+            x=subset['age'],
+            y=subset['systolic_bp'],
+            mode='markers',
+            name=level,
+            marker=dict(color=color, size=sizes[mask], opacity=0.6),
+            customdata=subset[['patient_id', 'gender', 'diabetes']].to_numpy(),
+            hovertemplate='患者 %{customdata[0]}<br>性别 %{customdata[1]}<br>糖尿病 %{customdata[2]}'
+                          '<br>年龄 %{x}<br>收缩压 %{y}<extra></extra>'
+        ))
+    return fig.update_layout(
+        title=TITLE,
+        xaxis_title=LABELS['age'],
+        yaxis_title=LABELS['systolic_bp'],
+        legend_title='risk_level'
+    )
+
+
+def rasterize_risk_density(df, width=300, height=200):
+    """把患者按(年龄, 收缩压)分箱，返回RGB图片和坐标范围
+
+    颜色为该像素内各风险等级颜色按人数的加权平均，亮度随人数的对数加深，空白像素为白色。
+    """
+    x = df['age'].to_numpy(dtype=np.float64)
+    y = df['systolic_bp'].to_numpy(dtype=np.float64)
+    x_min, x_max = x.min(), x.max() + 1e-9
+    y_min, y_max = y.min(), y.max() + 1e-9
+
+    ix = ((x - x_min) / (x_max - x_min) * width).astype(np.int64)
+    iy = ((y - y_min) / (y_max - y_min) * height).astype(np.int64)
+
+    levels = list(RISK_RGB)
+    level_codes = df['risk_level'].map({level: i for i, level in enumerate(levels)}).to_numpy()
+    counts = np.bincount(
+        (level_codes * height + iy) * width + ix,
+        minlength=len(levels) * height * width
+    ).reshape(len(levels), height, width).astype(np.float64)
+
+    total = counts.sum(axis=0)
+    palette = np.array([RISK_RGB[level] for level in levels], dtype=np.float64)
+    mean_color = np.einsum('lhw,lc->hwc', counts, palette) / np.maximum(total, 1)[..., None]
+    intensity = (np.log1p(total) / np.log1p(total.max()))[..., None]
+    image = 255 - intensity * (255 - mean_color)
+
+    extent = (x_min, x_max, y_min, y_max)
+    return image.astype(np.uint8), extent
+
+
+def _png_data_uri(image):
+    """把RGB数组编码为PNG的data URI，比逐像素的JSON数组小得多"""
+    height, width, _ = image.shape
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    # PNG逐行存储，每行前加一个字节的过滤类型(0)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 3)])
+    png = (b'\x89PNG\r\n\x1a\n'
+           + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+           + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+           + chunk(b'IEND', b''))
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+def _build_density_image(df, width=300, height=200):
+    """服务器端栅格化的密度图，图表大小只与像素数有关，与患者数量无关"""
+    image, (x_min, x_max, y_min, y_max) = rasterize_risk_density(df, width, height)
+    fig = go.Figure(go.Image(
+        source=_png_data_uri(image),
+        x0=x_min,
+        dx=(x_max - x_min) / width,
+        y0=y_min,
+        dy=(y_max - y_min) / height,
+        hovertemplate='年龄 %{x:.0f}<br>收缩压 %{y:.0f}<extra></extra>'
+    ))
+    return fig.update_layout(
+        title=f'{TITLE}（{len(df)}名患者密度图）',
+        xaxis_title=LABELS['age'],
+        yaxis=dict(title=LABELS['systolic_bp'], autorange=True)
+    )
+
+
+def nearest_patient(df, x, y):
+    """查找离光标位置最近的患者（两个坐标轴按取值范围归一化后计算距离）"""
+    age = df['age'].to_numpy(dtype=np.float64)
+    sbp = df['systolic_bp'].to_numpy(dtype=np.float64)
+    dx = (age - x) / max(np.ptp(age), 1)
+    dy = (sbp - y) / max(np.ptp(sbp), 1)
+    return df.iloc[int(np.argmin(dx * dx + dy * dy))]
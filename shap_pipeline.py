@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import shap
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics import pairwise_distances_argmin
+
+
+def kmeans_background(X, n_clusters=100, random_state=42):
+    """用K-means聚类中心概括SHAP背景数据集
+
+    聚类中心会被替换为离它最近的真实样本，避免吸烟、糖尿病等二值特征出现0.3这类不存在的取值。
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) <= n_clusters:
+        return X.copy()
+
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3,
+                             batch_size=max(1024, 10 * n_clusters))
+    kmeans.fit(X)
+    nearest = pairwise_distances_argmin(kmeans.cluster_centers_, X)
+    return X[np.unique(nearest)]
+
+
+def _select_class(values, class_index):
+    """兼容新旧版本shap的分类模型输出格式"""
+    if isinstance(values, list):
+        return values[class_index]
+    if values.ndim == 3:
+        return values[:, :, class_index]
+    return values
+
+
+def _explain_ranges(model, background, X, out_path, ranges, class_index):
+    """在工作进程中逐块解释样本，并把结果直接写入磁盘上的SHAP矩阵"""
+    # 每个工作进程只构建一次解释器，之后按块流式处理
+    explainer = shap.TreeExplainer(model, data=background, feature_perturbation='interventional')
+    out = np.load(out_path, mmap_mode='r+')
+    for start, stop in ranges:
+        values = explainer.shap_values(X[start:stop], check_additivity=False)
+        out[start:stop] = _select_class(values, class_index)
+    out.flush()
+    del out
+
+    expected = np.atleast_1d(explainer.expected_value)
+    return float(expected[class_index] if len(expected) > 1 else expected[0])
+
+
+def explain_to_memmap(model, X, out_path, background=None, background_size=100,
+                      chunk_size=10000, class_index=1, n_jobs=-1, random_state=42):
+    """分块并行计算TreeExplainer的SHAP值，结果保存为磁盘上的内存映射矩阵
+
+    X可以是DataFrame、数组或np.load(..., mmap_mode='r')得到的内存映射，
+    内存占用只与chunk_size和工作进程数有关，与样本总数无关。
+    返回(内存映射的SHAP矩阵, 基准期望值)。
+    """
+    if hasattr(X, 'values'):
+        X = X.values
+    if not isinstance(X, np.memmap):
+        X = np.asarray(X, dtype=np.float64)
+    n_samples, n_features = X.shape
+
+    if background is None:
+        background = kmeans_background(X[:min(n_samples, 100000)], background_size, random_state)
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(n_samples, n_features))
+    del out
+
+    # 把所有数据块轮流分配给各工作进程，每个进程只需接收一次模型
+    ranges = [(start, min(start + chunk_size, n_samples)) for start in range(0, n_samples, chunk_size)]
+    n_workers = min(effective_n_jobs(n_jobs), len(ranges))
+    assignments = [ranges[w::n_workers] for w in range(n_workers)]
+
+    expected_values = Parallel(n_jobs=n_workers)(
+        delayed(_explain_ranges)(model, background, X, out_path, worker_ranges, class_index)
+        for worker_ranges in assignments
+    )
+
+    return np.load(out_path, mmap_mode='r'), expected_values[0]
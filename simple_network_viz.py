@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 from matplotlib.patches import Patch
+from layout_cache import LayoutCache
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
@@ -55,8 +56,9 @@ for source, target, weight in connections:
     if source in G and target in G:  # 确保节点存在
         G.add_edge(source, target, weight=weight)
 
-# 布局
-pos = nx.spring_layout(G, k=0.4, seed=42)
+# 布局（按网络结构缓存到磁盘，结构和边权不变时直接复用）
+layout_cache = LayoutCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.layout_cache', 'simple_network_viz.json'))
+pos = layout_cache.spring_layout(G, k=0.4, seed=42)
 
 # 节点颜色映射
 color_map = {'symptom': '#E57373', 'treatment': '#64B5F6', 'medication': '#81C784'}
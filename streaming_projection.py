@@ -0,0 +1,44 @@
+import numpy as np
+from sklearn.decomposition import IncrementalPCA
+from sklearn.preprocessing import StandardScaler
+
+
+def rows_matrix(df, features, indices=None):
+    """逐列取出特征矩阵（可只取部分行），不经过DataFrame的按行索引"""
+    columns = [df[feature].to_numpy() for feature in features]
+    if indices is not None:
+        columns = [column[indices] for column in columns]
+    return np.column_stack(columns).astype(np.float64)
+
+
+class StreamingProjection:
+    """基于IncrementalPCA的低维投影：标准化器和主成分都只用partial_fit更新
+
+    新增或变化的患者批次到达时调用partial_fit，无需保存完整矩阵，也不必从头重新拟合；
+    变化的患者按新样本计入，近期数据的权重因此略高。
+    """
+
+    def __init__(self, n_components=2, batch_size=10000):
+        self.n_components = n_components
+        self.batch_size = batch_size
+        self.scaler = StandardScaler()
+        self.pca = IncrementalPCA(n_components=n_components)
+        self.n_updates = 0
+
+    def partial_fit(self, X):
+        """用一批样本更新投影，大批量按batch_size切块；样本数少于主成分数的批次先忽略"""
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) < self.n_components:
+            return self
+        for start in range(0, len(X), self.batch_size):
+            batch = X[start:start + self.batch_size]
+            if len(batch) < self.n_components:
+                break
+            self.scaler.partial_fit(batch)
+            self.pca.partial_fit(self.scaler.transform(batch))
+        self.n_updates += 1
+        return self
+
+    def transform(self, X):
+        """投影到低维空间"""
+        return self.pca.transform(self.scaler.transform(np.asarray(X, dtype=np.float64)))
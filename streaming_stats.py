@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import TDigest
+
+
+class RunningCovariance:
+    """流式均值与协方差：保存样本数、均值和离差积矩阵，按批更新
+
+    批与批、进程与进程之间用Chan等人的并行合并公式合并，
+    不会出现 E[xy] - E[x]E[y] 在大样本上的数值抵消问题。
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        d = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(d)
+        self.comoment = np.zeros((d, d))
+
+    def update(self, X):
+        """加入一批样本（二维数组或DataFrame，列顺序与columns一致）"""
+        X = np.asarray(X[self.columns] if isinstance(X, pd.DataFrame) else X, dtype=np.float64)
+        if not len(X):
+            return self
+        batch_mean = X.mean(axis=0)
+        centered = X - batch_mean
+        return self._merge(len(X), batch_mean, centered.T @ centered)
+
+    def merge(self, other):
+        """合并另一份统计量（例如另一个工作进程的结果）"""
+        return self._merge(other.n, other.mean, other.comoment)
+
+    def _merge(self, n, mean, comoment):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = mean - self.mean
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.n * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.n = total
+        return self
+
+    def covariance(self, ddof=1):
+        """协方差矩阵"""
+        return pd.DataFrame(self.comoment / max(self.n - ddof, 1), index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson相关系数矩阵"""
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.outer(std, std)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class StreamingCorrelation:
+    """可增量更新的Pearson与近似Spearman相关系数
+
+    Spearman用每列的t-digest把数值换成近似秩（累积分布值），再对秩累计协方差。
+    单遍更新时，每批数据用加入该批之后的草图计算秩，早期批次的秩略有偏差；
+    数据可以重复读取时用rank_pass()在草图定型后再计算一遍秩，结果更准确。
+    只需要Pearson时传spearman=False，不维护草图和秩；之后会调用rank_pass()时
+    传single_pass_ranks=False，只维护草图，省去单遍的秩计算。
+    """
+
+    def __init__(self, columns, compression=200, spearman=True, single_pass_ranks=True):
+        self.columns = list(columns)
+        self.values = RunningCovariance(self.columns)
+        self.ranks = RunningCovariance(self.columns) if spearman else None
+        self.digests = {column: TDigest(compression) for column in self.columns} if spearman else None
+        self.single_pass_ranks = spearman and single_pass_ranks
+
+    def update(self, df):
+        """加入一批新患者"""
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        self.values.update(X)
+        if self.digests is not None:
+            for i, column in enumerate(self.columns):
+                self.digests[column].update(X[:, i])
+        if self.single_pass_ranks:
+            self.ranks.update(self._ranks(X))
+        return self
+
+    def _ranks(self, X):
+        return np.column_stack([self.digests[column].cdf(X[:, i]) for i, column in enumerate(self.columns)])
+
+    def rank_pass(self, chunks):
+        """用已定型的草图重新计算秩的协方差（第二遍读取数据）"""
+        self.ranks = RunningCovariance(self.columns)
+        for chunk in chunks:
+            self.ranks.update(self._ranks(chunk[self.columns].to_numpy(dtype=np.float64)))
+        return self
+
+    def merge(self, other):
+        """合并另一个工作进程的统计量"""
+        self.values.merge(other.values)
+        if self.digests is not None:
+            self.ranks.merge(other.ranks)
+            for column in self.columns:
+                self.digests[column].merge(other.digests[column])
+        return self
+
+    def pearson(self):
+        return self.values.correlation()
+
+    def spearman(self):
+        if self.ranks is None:
+            raise ValueError('创建时传入了spearman=False，没有维护秩统计量')
+        return self.ranks.correlation()
@@ -0,0 +1,136 @@
+import threading
+from collections import Counter
+import pandas as pd
+import plotly.graph_objects as go
+
+AGGREGATE_COLUMNS = ['treatment', 'treatment_response', 'risk_level']
+RISK_COLORS = {'低': 'green', '中': 'yellow', '高': 'red'}
+
+
+class TreatmentAggregates:
+    """治疗方案 × 治疗反应 × 风险等级的人数表，随患者变化增量维护
+
+    图表只读取这张计数表，构建开销取决于类别组合数，与患者数量无关。
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @classmethod
+    def from_frame(cls, df):
+        """从完整的患者表一次性统计"""
+        aggregates = cls()
+        aggregates.add(df)
+        return aggregates
+
+    @staticmethod
+    def _group_sizes(rows):
+        if rows is None or len(rows) == 0:
+            return {}
+        return rows.groupby(AGGREGATE_COLUMNS, sort=False, observed=True).size().to_dict()
+
+    def add(self, rows):
+        """加入新患者（只对这批行分组计数）"""
+        self.apply_changes(added=rows)
+
+    def remove(self, rows):
+        """移除患者"""
+        self.apply_changes(removed=rows)
+
+    def apply_changes(self, removed=None, added=None):
+        """患者记录变化时，先减去旧行的计数再加上新行的计数"""
+        removed_sizes = self._group_sizes(removed)
+        added_sizes = self._group_sizes(added)
+        if not removed_sizes and not added_sizes:
+            return
+
+        with self._lock:
+            self._counts.subtract(removed_sizes)
+            self._counts.update(added_sizes)
+            # 去掉计数为0的组合，避免图表中出现空扇区
+            for key in [key for key, n in self._counts.items() if n <= 0]:
+                del self._counts[key]
+            self.version += 1
+
+    def table(self):
+        """返回计数表，列为treatment、treatment_response、risk_level、count"""
+        with self._lock:
+            items = sorted(self._counts.items())
+        return pd.DataFrame([(*key, n) for key, n in items], columns=AGGREGATE_COLUMNS + ['count'])
+
+    def response_counts(self):
+        """按治疗方案和治疗反应汇总的人数"""
+        return self.table().groupby(['treatment', 'treatment_response'], sort=True)['count'].sum()
+
+    def sunburst(self, title='实时治疗方案效果分析'):
+        """用计数表直接构建go.Sunburst，内层扇区的值为子扇区之和"""
+        table = self.table()
+        ids, labels, parents, values, colors = [], [], [], [], []
+
+        def add_sector(sector_id, label, parent, value, color):
+            ids.append(sector_id)
+            labels.append(label)
+            parents.append(parent)
+            values.append(int(value))
+            colors.append(color)
+
+        for treatment, group in table.groupby('treatment', sort=True):
+            add_sector(treatment, treatment, '', group['count'].sum(), 'lightgrey')
+            for response, leaves in group.groupby('treatment_response', sort=True):
+                response_id = f'{treatment}/{response}'
+                add_sector(response_id, response, treatment, leaves['count'].sum(), 'lightgrey')
+                for risk_level, n in zip(leaves['risk_level'], leaves['count']):
+                    add_sector(f'{response_id}/{risk_level}', risk_level, response_id, n,
+                               RISK_COLORS.get(risk_level, 'lightgrey'))
+
+        fig = go.Figure(go.Sunburst(
+            ids=ids,
+            labels=labels,
+            parents=parents,
+            values=values,
+            branchvalues='total',
+            marker=dict(colors=colors)
+        ))
+        return fig.update_layout(title=title, transition_duration=500)
+
+    def response_bar(self, title='实时治疗效果评估'):
+        """用汇总表直接构建分组柱状图，每种治疗反应一个动画帧"""
+        counts = self.response_counts()
+        treatments = list(counts.index.get_level_values('treatment').unique())
+        responses = list(counts.index.get_level_values('treatment_response').unique())
+
+        def response_trace(response):
+            series = counts.xs(response, level='treatment_response').reindex(treatments, fill_value=0)
+            return go.Bar(x=treatments, y=series.values, name=response)
+
+        frames = [go.Frame(data=[response_trace(response)], name=response) for response in responses]
+        fig = go.Figure(
+            data=frames[0].data if frames else [],
+            frames=frames
+        )
+        return fig.update_layout(
+            title=title,
+            barmode='group',
+            xaxis_title='treatment',
+            yaxis=dict(title='count', range=[0, counts.max() * 1.1 if len(counts) else 1]),
+            transition_duration=500,
+            updatemenus=[{
+                'type': 'buttons',
+                'showactive': False,
+                'buttons': [{
+                    'label': '播放',
+                    'method': 'animate',
+                    'args': [None, {'frame': {'duration': 1000, 'redraw': True}, 'fromcurrent': True}]
+                }]
+            }],
+            sliders=[{
+                'currentvalue': {'prefix': 'treatment_response='},
+                'steps': [{
+                    'label': response,
+                    'method': 'animate',
+                    'args': [[response], {'mode': 'immediate', 'frame': {'duration': 0, 'redraw': True}}]
+                } for response in responses]
+            }]
+        )
@@ -0,0 +1,56 @@
+import threading
+import numpy as np
+
+
+class VitalsStore:
+    """每名患者一个预分配的生命体征环形缓冲区，所有浏览器会话共享只读
+
+    所有患者按同一服务器时钟一起采样，时间戳只保存一份；
+    内存为 患者数 × 窗口长度 × 2个int16，10万名患者、窗口50时约20MB。
+    """
+
+    def __init__(self, n_patients, window=50):
+        self.n_patients = n_patients
+        self.window = window
+        # 按(采样槽, 患者)存放，每次采样写入连续的一行
+        self._systolic = np.zeros((window, n_patients), dtype=np.int16)
+        self._heart_rate = np.zeros((window, n_patients), dtype=np.int16)
+        self._timestamps = np.zeros(window, dtype='datetime64[ms]')
+        self._lock = threading.Lock()
+        # 已写入的采样总数，同时作为会话判断是否有新采样的计数器
+        self.tick = 0
+
+    def append(self, systolic_bp, heart_rate, timestamp):
+        """为所有患者写入一次采样（长度为n_patients的数组），覆盖最旧的一个采样槽"""
+        with self._lock:
+            slot = self.tick % self.window
+            self._systolic[slot] = systolic_bp
+            self._heart_rate[slot] = heart_rate
+            self._timestamps[slot] = np.datetime64(timestamp, 'ms')
+            self.tick += 1
+
+    def _slots(self, since):
+        """按时间顺序返回tick大于since的采样所在的槽"""
+        start = max(since, self.tick - self.window, 0)
+        return np.arange(start, self.tick) % self.window
+
+    def history(self, patient_index, since=0):
+        """返回某名患者的(时间戳, 收缩压, 心率)，只包含第since次之后写入的采样，按时间先后排列"""
+        return self.snapshot(patient_index, since)[1:]
+
+    def snapshot(self, patient_index, since=0):
+        """同history()，另外在最前面返回这些采样截止时的tick；两者在同一把锁内读取，不会错位"""
+        with self._lock:
+            slots = self._slots(since)
+            return (self.tick,
+                    self._timestamps[slots].astype(object),
+                    self._systolic[slots, patient_index].astype(int),
+                    self._heart_rate[slots, patient_index].astype(int))
+
+
+def sample_vitals(systolic_bp, heart_rate, rng):
+    """在患者当前生命体征附近生成一次测量值"""
+    n = len(systolic_bp)
+    systolic = np.clip(systolic_bp + rng.randint(-10, 11, n), 70, 220)
+    heart = np.clip(heart_rate + rng.randint(-5, 6, n), 40, 160)
+    return systolic, heart